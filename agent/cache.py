@@ -0,0 +1,378 @@
+# type: ignore
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Numbers, operators, signs and operator words: the part of a query that
+# embeddings barely see but that changes a calculation's answer
+MATH_TOKEN_RE = re.compile(
+    r"\d+(?:\.\d+)?|[+\-*/^%()=]|\b(?:plus|minus|times|multiplied|divided|over|percent|mod|sqrt|root|squared|cubed|"
+    r"power|factorial|log|ln|sin|cos|tan)\b"
+)
+
+
+def math_key(normalized: str) -> tuple:
+    """The numbers, operators and operator words of a normalized query, in order."""
+    return tuple(MATH_TOKEN_RE.findall(normalized))
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop spacing/punctuation that never changes meaning."""
+    text = query.lower().strip().rstrip("?.!")
+    text = re.sub(r"\s*([+\-*/^%()=])\s*", r"\1", text)
+    return re.sub(r"\s+", " ", text)
+
+
+class SemanticCache:
+    """Bounded LRU cache of (result, source) answers looked up by query embedding.
+
+    A hit needs cosine similarity >= threshold and the same math_key (numbers,
+    operators and signs in the same order), so "what is 5*3" never answers
+    "what is 5*4", "what is 5+3" or "what is 5*-3". Entries expire after the
+    TTL of the route that produced them (None means never). generations maps a
+    route to a function returning the current version of the data its answers
+    depend on (e.g. the document index); an entry stored under another version
+    is stale, even when that data was changed by another process.
+    """
+
+    def __init__(self, embed_fn, threshold: float = 0.92, maxsize: int = 1000, ttls: dict = None, default_ttl: float = None,
+                 generations: dict = None):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.generations = generations or {}
+        # slot -> (normalized, math key, result, source, route, expires_at, generation)
+        self._entries = OrderedDict()
+        self._by_text = {}  # normalized -> slot
+        self._vectors = None
+        self._free = list(range(maxsize - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, normalized: str):
+        vector = np.asarray(self.embed_fn(normalized), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, entry, now, generations) -> bool:
+        if entry[4] in generations and entry[6] != generations[entry[4]]:
+            return True
+        return entry[5] is not None and entry[5] <= now
+
+    def _evict(self, slot):
+        entry = self._entries.pop(slot)
+        if self._by_text.get(entry[0]) == slot:
+            del self._by_text[entry[0]]
+        self._free.append(slot)
+
+    def get(self, query: str):
+        """Return the cached (result, source) for query, or None."""
+        normalized = normalize_query(query)
+        key = math_key(normalized)
+        with self._lock:
+            slot = self._by_text.get(normalized)
+            search = slot is None and bool(self._entries)
+        vector = self._embed(normalized) if search else None
+        now = time.time()
+        generations = {route: generation() for route, generation in self.generations.items()}
+        with self._lock:
+            if vector is not None:
+                slots = [s for s, entry in self._entries.items() if entry[1] == key and not self._expired(entry, now, generations)]
+                if slots:
+                    scores = self._vectors[slots] @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        slot = slots[best]
+            entry = self._entries.get(slot)
+            if entry is not None and not self._expired(entry, now, generations):
+                self._entries.move_to_end(slot)
+                self.hits += 1
+                return entry[2], entry[3]
+            if entry is not None:
+                self._evict(slot)
+            self.misses += 1
+            return None
+
+    def put(self, query: str, result, source: str, route: str):
+        ttl = self.ttls.get(route, self.default_ttl)
+        if ttl == 0:
+            return
+        normalized = normalize_query(query)
+        vector = self._embed(normalized)
+        expires_at = time.time() + ttl if ttl is not None else None
+        generation = self.generations[route]() if route in self.generations else None
+        with self._lock:
+            if normalized in self._by_text:
+                self._evict(self._by_text[normalized])
+            if not self._free:
+                self._evict(next(iter(self._entries)))
+            slot = self._free.pop()
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+            self._vectors[slot] = vector
+            self._entries[slot] = (normalized, math_key(normalized), result, source, route, expires_at, generation)
+            self._by_text[normalized] = slot
+
+    def clear(self, route: str = None):
+        """Drop every entry, or only those produced by route."""
+        with self._lock:
+            for slot in [s for s, entry in self._entries.items() if route is None or entry[4] == route]:
+                self._evict(slot)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class CacheBackend:
+    """Namespaced key-value store for tool results, shaped like a Redis client.
+
+    Values must be JSON-serializable. ttl is in seconds (None = no expiry) and
+    max_entries caps a namespace, evicting its least recently used keys.
+    """
+
+    def get(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value, ttl: float = None, max_entries: int = None):
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def clear(self, namespace: str = None):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Per-namespace {"size", "hits", "misses", "hit_rate"}."""
+        raise NotImplementedError
+
+
+def _stats_row(size: int, hits: int, misses: int) -> dict:
+    total = hits + misses
+    return {"size": size, "hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+class MemoryCache(CacheBackend):
+    """Process-local backend; also the stand-in for a Redis-style store in tests and single workers."""
+
+    def __init__(self):
+        self._data = {}  # namespace -> OrderedDict(key -> (value, expires_at))
+        self._hits = {}
+        self._misses = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str):
+        with self._lock:
+            entries = self._data.get(namespace, {})
+            item = entries.get(key)
+            if item is not None and (item[1] is None or item[1] > time.time()):
+                entries.move_to_end(key)
+                self._hits[namespace] = self._hits.get(namespace, 0) + 1
+                return item[0]
+            if item is not None:
+                del entries[key]
+            self._misses[namespace] = self._misses.get(namespace, 0) + 1
+            return None
+
+    def set(self, namespace: str, key: str, value, ttl: float = None, max_entries: int = None):
+        with self._lock:
+            entries = self._data.setdefault(namespace, OrderedDict())
+            entries[key] = (value, time.time() + ttl if ttl is not None else None)
+            entries.move_to_end(key)
+            while max_entries is not None and len(entries) > max_entries:
+                entries.popitem(last=False)
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._data.get(namespace, {}).pop(key, None)
+
+    def clear(self, namespace: str = None):
+        with self._lock:
+            for name in [namespace] if namespace else list(self._data):
+                self._data.pop(name, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            names = set(self._data) | set(self._hits) | set(self._misses)
+            return {
+                name: _stats_row(len(self._data.get(name, {})), self._hits.get(name, 0), self._misses.get(name, 0))
+                for name in sorted(names)
+            }
+
+
+class SQLiteCache(CacheBackend):
+    """File-backed backend shared by every worker process on the host and kept across restarts.
+
+    WAL mode lets readers and one writer proceed concurrently; hit/miss counters
+    live in the same file so stats() reflects all processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, accessed_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS metrics ("
+                "namespace TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0, misses INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, conn, namespace: str, column: str):
+        conn.execute("INSERT OR IGNORE INTO metrics (namespace) VALUES (?)", (namespace,))
+        conn.execute(f"UPDATE metrics SET {column} = {column} + 1 WHERE namespace = ?", (namespace,))
+
+    def get(self, namespace: str, key: str):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is not None and (row[1] is None or row[1] > now):
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+                self._count(conn, namespace, "hits")
+                return json.loads(row[0])
+            if row is not None:
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            self._count(conn, namespace, "misses")
+            return None
+
+    def set(self, namespace: str, key: str, value, ttl: float = None, max_entries: int = None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl if ttl is not None else None, now),
+            )
+            if max_entries is not None:
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND expires_at <= ?", (namespace, now))
+                conn.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND key IN ("
+                    "SELECT key FROM entries WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (namespace, namespace, max_entries),
+                )
+
+    def delete(self, namespace: str, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace: str = None):
+        with self._connect() as conn:
+            if namespace:
+                conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            else:
+                conn.execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        sizes = dict(conn.execute("SELECT namespace, COUNT(*) FROM entries GROUP BY namespace").fetchall())
+        counters = {name: (hits, misses) for name, hits, misses in conn.execute("SELECT namespace, hits, misses FROM metrics")}
+        return {
+            name: _stats_row(sizes.get(name, 0), *counters.get(name, (0, 0)))
+            for name in sorted(set(sizes) | set(counters))
+        }
+
+
+class RedisCache(CacheBackend):
+    """Backend for a shared Redis server; requires the optional `redis` package."""
+
+    def __init__(self, url: str, prefix: str = "agent-cache"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis).") from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _lru(self, namespace: str) -> str:
+        return f"{self.prefix}:lru:{namespace}"
+
+    def get(self, namespace: str, key: str):
+        raw = self.client.get(self._key(namespace, key))
+        pipe = self.client.pipeline()
+        if raw is not None:
+            pipe.zadd(self._lru(namespace), {key: time.time()})
+        pipe.hincrby(f"{self.prefix}:stats:{namespace}", "hits" if raw is not None else "misses", 1)
+        pipe.execute()
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, namespace: str, key: str, value, ttl: float = None, max_entries: int = None):
+        pipe = self.client.pipeline()
+        pipe.set(self._key(namespace, key), json.dumps(value), px=int(ttl * 1000) if ttl is not None else None)
+        pipe.zadd(self._lru(namespace), {key: time.time()})
+        pipe.execute()
+        if max_entries is not None:
+            overflow = self.client.zcard(self._lru(namespace)) - max_entries
+            if overflow > 0:
+                stale = self.client.zrange(self._lru(namespace), 0, overflow - 1)
+                pipe = self.client.pipeline()
+                pipe.delete(*[self._key(namespace, k.decode()) for k in stale])
+                pipe.zrem(self._lru(namespace), *stale)
+                pipe.execute()
+
+    def delete(self, namespace: str, key: str):
+        self.client.delete(self._key(namespace, key))
+        self.client.zrem(self._lru(namespace), key)
+
+    def clear(self, namespace: str = None):
+        pattern = f"{self.prefix}:{namespace}:*" if namespace else f"{self.prefix}:*"
+        keys = list(self.client.scan_iter(pattern))
+        if namespace:
+            keys.append(self._lru(namespace))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> dict:
+        result = {}
+        for stats_key in self.client.scan_iter(f"{self.prefix}:stats:*"):
+            name = stats_key.decode().split(":stats:", 1)[1]
+            counters = self.client.hgetall(stats_key)
+            result[name] = _stats_row(
+                self.client.zcard(self._lru(name)), int(counters.get(b"hits", 0)), int(counters.get(b"misses", 0))
+            )
+        return dict(sorted(result.items()))
+
+
+def create_cache_backend(kind: str, path: str = None, url: str = None) -> CacheBackend:
+    """Build the backend named by CACHE_BACKEND: "sqlite" (default), "memory" or "redis"."""
+    if kind == "memory":
+        return MemoryCache()
+    if kind == "redis":
+        return RedisCache(url)
+    if kind == "sqlite":
+        return SQLiteCache(path)
+    raise ValueError(f"Unknown cache backend: {kind}")
@@ -0,0 +1,142 @@
+# type: ignore
+import asyncio
+import threading
+from agent.config.settings import (
+    GROQ_API_KEY, HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY, HTTP_TIMEOUT, HTTP_POOL_TIMEOUT,
+    REPLAY_MODE
+)
+
+DEFAULT_MODEL = "llama3-8b-8192"
+
+_llms = {}
+_http_client = None
+_async_http_client = None
+_http_session = None
+_loop = None
+_lock = threading.Lock()
+
+# httpx and requests are imported by the getters below, so importing agent.clients stays cheap
+def _pool_limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+def get_http_client():
+    """Return the keep-alive httpx client shared by every ChatGroq instance.
+
+    HTTP_MAX_CONNECTIONS caps concurrent LLM requests for the whole process;
+    callers beyond the cap wait up to HTTP_POOL_TIMEOUT for a free connection.
+    """
+    global _http_client
+    if _http_client is None:
+        import httpx
+
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    limits=_pool_limits(),
+                    timeout=httpx.Timeout(HTTP_TIMEOUT, pool=HTTP_POOL_TIMEOUT),
+                )
+    return _http_client
+
+def get_async_http_client():
+    """Return the keep-alive httpx.AsyncClient used by async LLM and Serper calls.
+
+    Async connections belong to the event loop that opened them, so all async
+    agent work is expected to run on get_event_loop() (see run_sync).
+    """
+    global _async_http_client
+    if _async_http_client is None:
+        import httpx
+
+        with _lock:
+            if _async_http_client is None:
+                _async_http_client = httpx.AsyncClient(
+                    limits=_pool_limits(),
+                    timeout=httpx.Timeout(HTTP_TIMEOUT, pool=HTTP_POOL_TIMEOUT),
+                )
+    return _async_http_client
+
+def get_event_loop():
+    """Return the background event loop shared by all async agent calls, starting it once."""
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="agent-event-loop", daemon=True).start()
+                _loop = loop
+    return _loop
+
+def submit(coro):
+    """Schedule coro on the agent event loop and return a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+def run_sync(coro, timeout: float = None):
+    """Run coro on the agent event loop and block the calling thread for its result."""
+    loop = get_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from the agent event loop; await the coroutine instead.")
+    return submit(coro).result(timeout)
+
+def get_http_session():
+    """Return the keep-alive requests session shared by plain HTTP tools (Serper)."""
+    global _http_session
+    if _http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with _lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_MAX_KEEPALIVE, pool_maxsize=HTTP_MAX_CONNECTIONS, pool_block=True)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
+def get_llm(model: str = DEFAULT_MODEL, temperature: float = 0, max_tokens: int = 1024):
+    """Return the shared ChatGroq client for these settings, creating it on first use.
+
+    ChatGroq is safe to call from several threads, so one instance per
+    (model, temperature, max_tokens) is reused by the controller and every tool,
+    and all of them draw connections from the same pool. With REPLAY_MODE set
+    the client is wrapped in (or, for replay, replaced by) a ReplayChatModel.
+    """
+    key = (model, temperature, max_tokens)
+    llm = _llms.get(key)
+    if llm is None:
+        http_client = get_http_client()
+        http_async_client = get_async_http_client()
+        with _lock:
+            llm = _llms.get(key)
+            if llm is None:
+                # Imported here so that importing agent.clients stays cheap
+                from langchain_groq import ChatGroq
+                from agent.replay import ReplayChatModel
+                if REPLAY_MODE == "replay":
+                    llm = ReplayChatModel(model_name=model, temperature=temperature, max_tokens=max_tokens)
+                else:
+                    llm = ChatGroq(
+                        api_key=GROQ_API_KEY,
+                        model=model,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        http_client=http_client,
+                        http_async_client=http_async_client,
+                    )
+                    if REPLAY_MODE == "record":
+                        llm = ReplayChatModel(
+                            model_name=model, temperature=temperature, max_tokens=max_tokens, inner=llm
+                        )
+                _llms[key] = llm
+    return llm
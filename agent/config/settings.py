@@ -5,12 +5,119 @@ load_dotenv()
 
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 SERPER_API_KEY = os.environ.get("SERPER_API_KEY")
+# "off", "record" (live calls saved to the cassette) or "replay" (offline, no keys needed); see agent/replay.py
+REPLAY_MODE = os.environ.get("REPLAY_MODE", "off")
 
-if not GROQ_API_KEY:
+if not GROQ_API_KEY and REPLAY_MODE != "replay":
     raise ValueError("GROQ_API_KEY not set.")
-if not SERPER_API_KEY:
+if not SERPER_API_KEY and REPLAY_MODE != "replay":
     raise ValueError("SERPER_API_KEY not set.")
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DOCUMENTS_DIR = os.path.join(BASE_DIR, "data", "documents")
-os.makedirs(DOCUMENTS_DIR, exist_ok=True)
\ No newline at end of file
+os.makedirs(DOCUMENTS_DIR, exist_ok=True)
+
+# Persistent vector index for document_qa
+INDEX_DIR = os.environ.get("INDEX_DIR", os.path.join(BASE_DIR, "data", "index"))
+INDEX_MMAP = os.environ.get("INDEX_MMAP", "1") == "1"
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.environ.get("CHUNK_OVERLAP", "200"))
+# FAISS index type: "flat" (exact), "ivf_flat", "hnsw", "ivf_pq" or "ivf_sq"; see agent/rag/index_types.py
+INDEX_TYPE = os.environ.get("INDEX_TYPE", "flat")
+INDEX_PARAMS = {
+    "nlist": int(os.environ.get("INDEX_NLIST", "256")),
+    "nprobe": int(os.environ.get("INDEX_NPROBE", "16")),
+    "hnsw_m": int(os.environ.get("INDEX_HNSW_M", "32")),
+    "ef_construction": int(os.environ.get("INDEX_EF_CONSTRUCTION", "200")),
+    "ef_search": int(os.environ.get("INDEX_EF_SEARCH", "64")),
+    "pq_m": int(os.environ.get("INDEX_PQ_M", "48")),
+    "pq_nbits": int(os.environ.get("INDEX_PQ_NBITS", "8")),
+    "sq_type": os.environ.get("INDEX_SQ_TYPE", "QT_8bit"),
+    "train_size": int(os.environ.get("INDEX_TRAIN_SIZE", "20000")),
+}
+# Ingestion: parser processes (1 parses in-process) and chunks per embedding call
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+# Chunk de-duplication before embedding: "off", "exact" (same normalized text) or "near" (also SimHash
+# within DEDUP_MAX_DISTANCE of 64 bits)
+DEDUP_MODE = os.environ.get("DEDUP_MODE", "near")
+DEDUP_MAX_DISTANCE = int(os.environ.get("DEDUP_MAX_DISTANCE", "3"))
+# document_qa retrieval: "hybrid" (FAISS + BM25 fused by reciprocal rank) or "dense" (FAISS only)
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")
+HYBRID_FETCH_K = int(os.environ.get("HYBRID_FETCH_K", "20"))
+RRF_K = int(os.environ.get("RRF_K", "60"))
+# Persistent chunk embedding cache keyed by sha256(text) and EMBEDDING_MODEL
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_ENABLED", "1") == "1"
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", os.path.join(BASE_DIR, "data", "cache", "embeddings.sqlite"))
+# Load the embedding model and vector index in a background thread when the app starts
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1") == "1"
+
+
+# Shared HTTP connection pool for Groq and Serper calls
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "60"))
+HTTP_POOL_TIMEOUT = float(os.environ.get("HTTP_POOL_TIMEOUT", "30"))
+
+
+# Local rule/model pre-router in front of the controller LLM
+ROUTER_ENABLED = os.environ.get("ROUTER_ENABLED", "1") == "1"
+ROUTER_CONFIDENCE = float(os.environ.get("ROUTER_CONFIDENCE", "0.95"))
+# Softens the naive Bayes posterior (see agent/router.py); 1.0 leaves it uncalibrated
+ROUTER_TEMPERATURE = float(os.environ.get("ROUTER_TEMPERATURE", "1.5"))
+ROUTER_SEED_PATH = os.environ.get("ROUTER_SEED_PATH", os.path.join(BASE_DIR, "data", "router", "router_seed.json"))
+
+
+# Semantic response cache in front of ask_agent (TTL in seconds per route, None = never expires)
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_SIZE = int(os.environ.get("SEMANTIC_CACHE_SIZE", "1000"))
+SEMANTIC_CACHE_TTLS = {
+    "WEB_SEARCH": float(os.environ.get("SEMANTIC_CACHE_WEB_TTL", "300")),
+    "CHAIN": 300,
+    "DOCUMENT_QA": 3600,
+    "DIRECT": 86400,
+    "MATH_SOLVER": None,
+    "CALCULATOR": None,
+}
+
+
+# Shared tool-result cache: "sqlite" (file shared by all worker processes), "memory" or "redis"
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "sqlite")
+CACHE_PATH = os.environ.get("CACHE_PATH", os.path.join(BASE_DIR, "data", "cache", "agent_cache.sqlite"))
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+TOOL_CACHE_TTLS = {
+    "Web Search": float(os.environ.get("TOOL_CACHE_WEB_TTL", "300")),
+    "Document QA": 3600,
+    "Math Solver": None,
+    "Calculator": None,
+}
+TOOL_CACHE_MAX_ENTRIES = int(os.environ.get("TOOL_CACHE_MAX_ENTRIES", "1000"))
+
+
+# Controller routing decisions, cached apart from tool results
+ROUTE_CACHE_TTL = float(os.environ.get("ROUTE_CACHE_TTL", str(7 * 24 * 3600)))
+ROUTE_CACHE_MAX_ENTRIES = int(os.environ.get("ROUTE_CACHE_MAX_ENTRIES", "5000"))
+
+# Controller routing prompt: "full" (detailed guidelines) or "compact" (short few-shot)
+CONTROLLER_PROMPT_MODE = os.environ.get("CONTROLLER_PROMPT_MODE", "full")
+
+
+# Record/replay cassette for LLM and Serper responses; replayed calls sleep for the
+# recorded latency times REPLAY_LATENCY_SCALE, or a fixed REPLAY_LATENCY_MS when set
+CASSETTE_PATH = os.environ.get("CASSETTE_PATH", os.path.join(BASE_DIR, "data", "cassettes", "cassette.jsonl"))
+REPLAY_LATENCY_SCALE = float(os.environ.get("REPLAY_LATENCY_SCALE", "1.0"))
+REPLAY_LATENCY_MS = float(os.environ["REPLAY_LATENCY_MS"]) if os.environ.get("REPLAY_LATENCY_MS") else None
+
+
+# Per-stage request traces (JSON lines; see agent/tracing.py)
+TRACE_ENABLED = os.environ.get("TRACE_ENABLED", "1") == "1"
+TRACE_PATH = os.environ.get("TRACE_PATH", os.path.join(BASE_DIR, "data", "traces", "traces.jsonl"))
+# The file rotates to TRACE_PATH.1 .. .<TRACE_BACKUPS> past TRACE_MAX_BYTES (0 = no cap)
+TRACE_MAX_BYTES = int(os.environ.get("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.environ.get("TRACE_BACKUPS", "3"))
+# Query text (and the expression, tool order and error attrs derived from it) in the trace
+# file: "raw", "hash" (sha256 prefix, still groups repeats) or "redact"
+TRACE_QUERY_MODE = os.environ.get("TRACE_QUERY_MODE", "hash")
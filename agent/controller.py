@@ -1,166 +1,543 @@
 # type: ignore
 import sys
 import os
-import functools
+import time
+import queue
+import asyncio
+import importlib
+import threading
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain.prompts import PromptTemplate
-from langchain_groq import ChatGroq
-from langchain.agents import Tool
-from agent.tools.web_search import web_search
-from agent.tools.calculator import calculator
-from agent.tools.math_solver import math_solver
-from agent.tools.document_qa import document_qa
-from agent.config.settings import GROQ_API_KEY
-
-
-# LLM
-llm = ChatGroq(
-    api_key=GROQ_API_KEY,
-    model="llama3-8b-8192",  # As confirmed
-    temperature=0,
-    max_tokens=1024,
+from agent.clients import get_llm, run_sync, submit
+from agent.router import pre_route, count_route
+from agent.cache import SemanticCache, create_cache_backend, normalize_query
+from agent.errors import ERROR_RESULT_RE
+from agent.tracing import trace_request, span, record_llm_usage, token_usage_handler
+from agent.config.settings import (
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_TTLS,
+    CACHE_BACKEND, CACHE_PATH, REDIS_URL, TOOL_CACHE_TTLS, TOOL_CACHE_MAX_ENTRIES,
+    ROUTE_CACHE_TTL, ROUTE_CACHE_MAX_ENTRIES, CONTROLLER_PROMPT_MODE, INDEX_DIR
 )
 
-# Tools
-tools = [
-    Tool(
-        name="Web Search",
-        func=web_search,
-        description="For up-to-date information, current events, or facts that may change over time."
-    ),
-    Tool(
-        name="Calculator",
-        func=calculator,
-        description="For simple mathematical calculations and arithmetic problems."
-    ),
-    Tool(
-        name="Math Solver",
-        func=math_solver,
-        description="For complex math word problems requiring step-by-step reasoning."
-    ),
-    Tool(
-        name="Document QA",
-        func=document_qa,
-        description="For answering questions based on local documents and knowledge base."
-    )
-]
+
+# Tool name -> (module, attribute); tool modules and their heavy dependencies
+# (sympy, FAISS, sentence-transformers, ...) are imported on first use
+TOOL_MODULES = {
+    "Web Search": ("agent.tools.web_search", "web_search"),
+    "Calculator": ("agent.tools.calculator", "calculator"),
+    "Math Solver": ("agent.tools.math_solver", "math_solver"),
+    "Document QA": ("agent.tools.document_qa", "document_qa"),
+}
+# Tools whose answers can be streamed as they are generated
+STREAMING_TOOLS = {
+    "Math Solver": ("agent.tools.math_solver", "astream_math_solver"),
+}
+TOOL_DESCRIPTIONS = {
+    "Web Search": "For up-to-date information, current events, or facts that may change over time.",
+    "Calculator": "For simple mathematical calculations and arithmetic problems.",
+    "Math Solver": "For complex math word problems requiring step-by-step reasoning.",
+    "Document QA": "For answering questions based on local documents and knowledge base.",
+}
+
+def _load(spec):
+    module, attribute = spec
+    return getattr(importlib.import_module(module), attribute)
+
+def get_tool(tool_name):
+    """Return the tool registered under tool_name, importing its module on first use."""
+    spec = TOOL_MODULES.get(tool_name)
+    return _load(spec) if spec else None
+
+async def _aload(spec):
+    """_load for the event loop: a module's first import runs in a worker thread, not on the loop."""
+    module, attribute = spec
+    if hasattr(sys.modules.get(module), attribute):
+        return _load(spec)
+    return await asyncio.to_thread(_load, spec)
+
+async def aget_tool(tool_name):
+    """get_tool without blocking the event loop while the tool's module is first imported."""
+    spec = TOOL_MODULES.get(tool_name)
+    return await _aload(spec) if spec else None
 
 # Enhanced controller prompt (improved for better distinction between Calculator and Math Solver)
 # Enhanced controller prompt (improved for better distinction between Calculator and Math Solver)
-controller_prompt = PromptTemplate(
-    input_variables=["query"],
-    template=(
-        "You are an advanced controller AI tasked with analyzing user queries and selecting the most appropriate tool or combination of tools to provide accurate and efficient answers. "
-        "Your goal is to understand the query's intent, context, and requirements, then decide the best approach. "
-        "Follow the guidelines below and provide a clear reasoning for your choice.\n\n"
-        "Available Tools:\n"
-        "- WEB_SEARCH: For recent information (post-2023), current events, news, or facts that may change (e.g., weather, stock prices).\n"
-        "- CALCULATOR: For simple arithmetic operations or direct math expressions without story context (e.g., '2+2', 'sqrt(16)', '15% of 80', 'sin(30)'). Use only if it's a straightforward calculation.\n"
-        "- MATH_SOLVER: For complex math word problems with story context, scenarios, units, or requiring logical reasoning/multi-step solutions (e.g., 'A car travels 60 mph for 2 hours, how far?', 'If John has 5 apples and gives away 2, how many left?'). If there's a narrative, objects, or conditions, prefer this over CALCULATOR.\n"
-        "- DOCUMENT_QA: For questions about content in local files (PDF, TXT, DOCX) in the knowledge base, especially when the query pertains to any private documents, proprietary data, personal profiles, university prospectuses, or any other user-uploaded personal or confidential content. Prioritize this tool for all queries that reference or imply access to uploaded, private, or user-specific information not publicly available.\n"
-        "- DIRECT: For general knowledge questions (pre-2023) or simple queries not requiring tools.\n\n"
-        "Guidelines for Tool Selection:\n"
-        "1. Analyze the query for keywords, context, and intent:\n"
-        "   - Current events, news, or time-sensitive data (e.g., 'latest news', 'weather today') → WEB_SEARCH.\n"
-        "   - Direct numeric calculations or math expressions without narrative (e.g., '5 * 3', 'sin(30)', '25 minus 7') → CALCULATOR.\n"
-        "   - Word problems with story, scenarios, units, or reasoning (e.g., 'A bike goes 20 km/h for 3.5 hours', 'Sarah is three times older than her brother') → MATH_SOLVER. If it involves objects, people, or multi-step logic, use MATH_SOLVER even if simple arithmetic is involved.\n"
-        "   - Questions about specific documents or policies (e.g., 'What’s in the company handbook?'), or any private/personal data (e.g., 'When was the company founded?', 'What is in my profile?', 'Details from the prospectus') → DOCUMENT_QA. Give strong preference to DOCUMENT_QA for all queries that mention or imply private, personal, uploaded, or confidential content, even if public data might exist elsewhere; assume such queries refer to user-provided documents.\n"
-        "   - General knowledge or simple facts (e.g., 'Capital of France') → DIRECT.\n"
-        "2. For hybrid queries (e.g., 'Search for today’s temperature and calculate its Fahrenheit equivalent'):\n"
-        "   - Select CHAIN and specify the order of tools (e.g., 'WEB_SEARCH → CALCULATOR').\n"
-        "3. If unsure, prioritize DOCUMENT_QA for internal data (e.g., uploaded PDFs, texts), WEB_SEARCH for external data, or CHAIN for multi-step tasks.\n"
-        "4. Avoid using tools unnecessarily; DIRECT is preferred for simple, known facts.\n"
-        "5. Distinguish carefully: If query has a story like 'a bakery has cookies' or 'a tank holds liters', it's MATH_SOLVER. If it's just '20 * 3.5', it's CALCULATOR.\n"
-        "6. If no tool fits or the query is ambiguous, ask for clarification via DIRECT with a prompt like: 'Can you clarify what you mean by [query]?'\n\n"
-        "Query Analysis Steps:\n"
-        "1. Identify the main topic (e.g., math, news, document content).\n"
-        "2. Check for time sensitivity or external data needs.\n"
-        "3. Determine if reasoning or computation is required: Story/context → MATH_SOLVER, direct expr → CALCULATOR.\n"
-        "4. Evaluate if local documents are relevant, especially if the query relates to any private, personal, uploaded, or confidential content (e.g., profiles, prospectuses, company details) and strongly favor DOCUMENT_QA in such cases.\n"
-        "5. Decide if multiple tools are needed for a complete answer.\n\n"
-        "User query: {query}\n\n"
-        "Output Format:\n"
-        "Decision: [WEB_SEARCH | CALCULATOR | MATH_SOLVER | DOCUMENT_QA | DIRECT | CHAIN]\n"
-        "Tool Order (if CHAIN): [List tools in order, e.g., 'WEB_SEARCH → CALCULATOR']\n"
-        "Reasoning: [One-sentence explanation of why this tool/combination was chosen]"
-    ),
+CONTROLLER_TEMPLATE = (
+    "You are an advanced controller AI tasked with analyzing user queries and selecting the most appropriate tool or combination of tools to provide accurate and efficient answers. "
+    "Your goal is to understand the query's intent, context, and requirements, then decide the best approach. "
+    "Follow the guidelines below and provide a clear reasoning for your choice.\n\n"
+    "Available Tools:\n"
+    "- WEB_SEARCH: For recent information (post-2023), current events, news, or facts that may change (e.g., weather, stock prices).\n"
+    "- CALCULATOR: For simple arithmetic operations or direct math expressions without story context (e.g., '2+2', 'sqrt(16)', '15% of 80', 'sin(30)'). Use only if it's a straightforward calculation.\n"
+    "- MATH_SOLVER: For complex math word problems with story context, scenarios, units, or requiring logical reasoning/multi-step solutions (e.g., 'A car travels 60 mph for 2 hours, how far?', 'If John has 5 apples and gives away 2, how many left?'). If there's a narrative, objects, or conditions, prefer this over CALCULATOR.\n"
+    "- DOCUMENT_QA: For questions about content in local files (PDF, TXT, DOCX) in the knowledge base, especially when the query pertains to any private documents, proprietary data, personal profiles, university prospectuses, or any other user-uploaded personal or confidential content. Prioritize this tool for all queries that reference or imply access to uploaded, private, or user-specific information not publicly available.\n"
+    "- DIRECT: For general knowledge questions (pre-2023) or simple queries not requiring tools.\n\n"
+    "Guidelines for Tool Selection:\n"
+    "1. Analyze the query for keywords, context, and intent:\n"
+    "   - Current events, news, or time-sensitive data (e.g., 'latest news', 'weather today') → WEB_SEARCH.\n"
+    "   - Direct numeric calculations or math expressions without narrative (e.g., '5 * 3', 'sin(30)', '25 minus 7') → CALCULATOR.\n"
+    "   - Word problems with story, scenarios, units, or reasoning (e.g., 'A bike goes 20 km/h for 3.5 hours', 'Sarah is three times older than her brother') → MATH_SOLVER. If it involves objects, people, or multi-step logic, use MATH_SOLVER even if simple arithmetic is involved.\n"
+    "   - Questions about specific documents or policies (e.g., 'What’s in the company handbook?'), or any private/personal data (e.g., 'When was the company founded?', 'What is in my profile?', 'Details from the prospectus') → DOCUMENT_QA. Give strong preference to DOCUMENT_QA for all queries that mention or imply private, personal, uploaded, or confidential content, even if public data might exist elsewhere; assume such queries refer to user-provided documents.\n"
+    "   - General knowledge or simple facts (e.g., 'Capital of France') → DIRECT.\n"
+    "2. For hybrid queries (e.g., 'Search for today’s temperature and calculate its Fahrenheit equivalent'):\n"
+    "   - Select CHAIN and specify the order of tools (e.g., 'WEB_SEARCH → CALCULATOR').\n"
+    "3. If unsure, prioritize DOCUMENT_QA for internal data (e.g., uploaded PDFs, texts), WEB_SEARCH for external data, or CHAIN for multi-step tasks.\n"
+    "4. Avoid using tools unnecessarily; DIRECT is preferred for simple, known facts.\n"
+    "5. Distinguish carefully: If query has a story like 'a bakery has cookies' or 'a tank holds liters', it's MATH_SOLVER. If it's just '20 * 3.5', it's CALCULATOR.\n"
+    "6. If no tool fits or the query is ambiguous, ask for clarification via DIRECT with a prompt like: 'Can you clarify what you mean by [query]?'\n\n"
+    "Query Analysis Steps:\n"
+    "1. Identify the main topic (e.g., math, news, document content).\n"
+    "2. Check for time sensitivity or external data needs.\n"
+    "3. Determine if reasoning or computation is required: Story/context → MATH_SOLVER, direct expr → CALCULATOR.\n"
+    "4. Evaluate if local documents are relevant, especially if the query relates to any private, personal, uploaded, or confidential content (e.g., profiles, prospectuses, company details) and strongly favor DOCUMENT_QA in such cases.\n"
+    "5. Decide if multiple tools are needed for a complete answer.\n\n"
+    "User query: {query}\n\n"
+    "Output Format:\n"
+    "Decision: [WEB_SEARCH | CALCULATOR | MATH_SOLVER | DOCUMENT_QA | DIRECT | CHAIN]\n"
+    "Tool Order (if CHAIN): [List tools in order, e.g., 'WEB_SEARCH → CALCULATOR']\n"
+    "Reasoning: [One-sentence explanation of why this tool/combination was chosen]"
 )
 
-# Initialize agent with create_react_agent (updated with required variables)
-agent_prompt = PromptTemplate(
-    input_variables=["input", "agent_scratchpad", "tools", "tool_names"],
-    template=(
-        "You are a helpful AI assistant with access to the following tools: {tools}\n\n"
-        "Tool names: {tool_names}\n\n"
-        "Answer the following question as best you can, using the provided tools if necessary. "
-        "Think step by step, and chain tools if needed for complex queries. "
-        "For each step, explain your reasoning and use the format: [Action: Tool Name] or [Action: Direct Answer].\n\n"
-        "Question: {input}\n\n"
-        "Agent Scratchpad: {agent_scratchpad}"
-    )
+# Compact few-shot routing prompt: a fraction of the input tokens of CONTROLLER_TEMPLATE,
+# and only the Decision (plus Tool Order for CHAIN) is asked for, so replies are short too
+COMPACT_CONTROLLER_TEMPLATE = (
+    "Route the query to one option.\n"
+    "WEB_SEARCH: current or changing facts (news, weather, prices, post-2023)\n"
+    "CALCULATOR: a bare arithmetic expression\n"
+    "MATH_SOLVER: a math word problem with a story, objects or units\n"
+    "DOCUMENT_QA: private, uploaded, personal or company documents\n"
+    "DIRECT: stable general knowledge or conversation\n"
+    "CHAIN: several tools in sequence\n\n"
+    "Examples:\n"
+    "weather in Paris today -> Decision: WEB_SEARCH\n"
+    "sqrt(144) + 7 -> Decision: CALCULATOR\n"
+    "Tom has 5 apples and buys 3 more, how many now? -> Decision: MATH_SOLVER\n"
+    "what does my resume say about Python? -> Decision: DOCUMENT_QA\n"
+    "who wrote Hamlet? -> Decision: DIRECT\n"
+    "today's temperature in Tokyo in Fahrenheit ->\n"
+    "Decision: CHAIN\n"
+    "Tool Order: WEB_SEARCH → CALCULATOR\n\n"
+    "Query: {query}\n"
+    "Reply with only \"Decision: <OPTION>\" and, for CHAIN, a second line \"Tool Order: <A → B>\"."
 )
 
-agent = create_react_agent(
-    llm=llm,
-    tools=tools,
-    prompt=agent_prompt
+CONTROLLER_TEMPLATES = {"full": CONTROLLER_TEMPLATE, "compact": COMPACT_CONTROLLER_TEMPLATE}
+
+# Initialize agent with create_react_agent (updated with required variables)
+AGENT_TEMPLATE = (
+    "You are a helpful AI assistant with access to the following tools: {tools}\n\n"
+    "Tool names: {tool_names}\n\n"
+    "Answer the following question as best you can, using the provided tools if necessary. "
+    "Think step by step, and chain tools if needed for complex queries. "
+    "For each step, explain your reasoning and use the format: [Action: Tool Name] or [Action: Direct Answer].\n\n"
+    "Question: {input}\n\n"
+    "Agent Scratchpad: {agent_scratchpad}"
 )
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=tools,
-    verbose=True,
-    max_iterations=5,
-    handle_parsing_errors=True
+
+# The prompt templates, llm, tools, agent and agent_executor are built on first
+# access (module __getattr__ below), so importing the controller does not load
+# langchain, the Groq client or any tool module
+def _build_prompts():
+    from langchain_core.prompts import PromptTemplate
+    prompts = {
+        mode: PromptTemplate(input_variables=["query"], template=template)
+        for mode, template in CONTROLLER_TEMPLATES.items()
+    }
+    return {
+        "controller_prompt": prompts["full"],
+        "compact_controller_prompt": prompts["compact"],
+        "CONTROLLER_PROMPTS": prompts,
+        "routing_prompt": prompts.get(CONTROLLER_PROMPT_MODE, prompts["full"]),
+        "agent_prompt": PromptTemplate(
+            input_variables=["input", "agent_scratchpad", "tools", "tool_names"],
+            template=AGENT_TEMPLATE
+        ),
+    }
+
+def _build_llm():
+    # LLM (shared with the tools through agent.clients)
+    return get_llm(
+        model="llama3-8b-8192",  # As confirmed
+        temperature=0,
+        max_tokens=1024,
+    )
+
+def _build_tools():
+    from langchain.agents import Tool
+    return [
+        Tool(name=name, func=get_tool(name), description=TOOL_DESCRIPTIONS[name])
+        for name in TOOL_MODULES
+    ]
+
+def _build_agent():
+    from langchain.agents import create_react_agent
+    return create_react_agent(
+        llm=_lazy("llm"),
+        tools=_lazy("tools"),
+        prompt=_lazy("agent_prompt")
+    )
+
+def _build_agent_executor():
+    from langchain.agents import AgentExecutor
+    return AgentExecutor(
+        agent=_lazy("agent"),
+        tools=_lazy("tools"),
+        verbose=True,
+        max_iterations=5,
+        handle_parsing_errors=True
+    )
+
+_PROMPT_ATTRIBUTES = ("controller_prompt", "compact_controller_prompt", "CONTROLLER_PROMPTS", "routing_prompt", "agent_prompt")
+_LAZY_ATTRIBUTES = {
+    **{name: _build_prompts for name in _PROMPT_ATTRIBUTES},
+    "llm": _build_llm,
+    "tools": _build_tools,
+    "agent": _build_agent,
+    "agent_executor": _build_agent_executor,
+}
+_lazy_lock = threading.RLock()
+
+def __getattr__(name):
+    builder = _LAZY_ATTRIBUTES.get(name)
+    if builder is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if name not in globals():
+            value = builder()
+            if builder is _build_prompts:
+                for key, prompt in value.items():
+                    globals().setdefault(key, prompt)
+            else:
+                globals()[name] = value
+    return globals()[name]
+
+def _lazy(name):
+    """Module global name, building it on first use; assigning controller.<name> overrides it."""
+    return globals()[name] if name in globals() else __getattr__(name)
+
+async def _alazy(name):
+    """_lazy for the event loop: the first build (and its imports) runs in a worker thread."""
+    return globals()[name] if name in globals() else await asyncio.to_thread(__getattr__, name)
+
+# Decision -> (tool name, source label) for single-tool routes
+TOOL_ROUTES = {
+    "WEB_SEARCH": ("Web Search", "🌐 Web Search Tool"),
+    "CALCULATOR": ("Calculator", "🧮 Calculator Tool"),
+    "MATH_SOLVER": ("Math Solver", "➗ Math Solver Tool"),
+    "DOCUMENT_QA": ("Document QA", "📄 Document QA Tool"),
+}
+
+# Cache for performance: tool results shared by all worker processes through
+# the configured backend, with a TTL per tool
+cache_backend = create_cache_backend(CACHE_BACKEND, path=CACHE_PATH, url=REDIS_URL)
+
+async def _tool_cache_get(tool_name, query):
+    with span("tool_cache", tool=tool_name) as record:
+        try:
+            cached = await asyncio.to_thread(cache_backend.get, f"tool:{tool_name}", query)
+        except Exception as e:
+            print(f"Tool cache lookup failed: {e}")
+            cached = None
+        record["attrs"]["hit"] = cached is not None
+    return cached
+
+async def _tool_cache_put(tool_name, query, result):
+    if ERROR_RESULT_RE.match(str(result)):
+        return
+    try:
+        await asyncio.to_thread(
+            cache_backend.set, f"tool:{tool_name}", query, result, TOOL_CACHE_TTLS.get(tool_name), TOOL_CACHE_MAX_ENTRIES
+        )
+    except Exception as e:
+        print(f"Tool cache store failed: {e}")
+
+async def cached_tool_call(tool_name, query):
+    cached = await _tool_cache_get(tool_name, query)
+    if cached is not None:
+        return cached
+    tool = await aget_tool(tool_name)
+    if tool is None:
+        return None
+    with span("tool", tool=tool_name):
+        result = await tool.ainvoke(query)
+    await _tool_cache_put(tool_name, query, result)
+    return result
+
+async def cached_tool_stream(tool_name, query):
+    """Like cached_tool_call, but yields the result in chunks; a cached result is one chunk."""
+    cached = await _tool_cache_get(tool_name, query)
+    if cached is not None:
+        yield cached
+        return
+    chunks = []
+    with span("tool", tool=tool_name, stream=True):
+        async for chunk in (await _aload(STREAMING_TOOLS[tool_name]))(query):
+            chunks.append(chunk)
+            yield chunk
+    await _tool_cache_put(tool_name, query, "".join(chunks))
+
+ROUTE_NAMESPACE = "route"
+DECISIONS = ("WEB_SEARCH", "CALCULATOR", "MATH_SOLVER", "DOCUMENT_QA", "DIRECT", "CHAIN")
+
+def _embed_query(text: str):
+    from agent.tools.document_qa import get_embeddings, is_warming_up
+    if is_warming_up():
+        # Count as a semantic cache miss rather than wait for the model to load
+        raise RuntimeError("embedding model is still warming up")
+    return get_embeddings().embed_query(text)
+
+def _index_generation():
+    from agent.rag.index_store import index_generation
+    return index_generation(INDEX_DIR)
+
+# Answers keyed by query meaning, reusing document_qa's MiniLM embeddings; answers
+# that may come from the documents are stale once any process saves a new index
+semantic_cache = SemanticCache(
+    embed_fn=_embed_query,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    maxsize=SEMANTIC_CACHE_SIZE,
+    ttls=SEMANTIC_CACHE_TTLS,
+    generations={"DOCUMENT_QA": _index_generation, "CHAIN": _index_generation},
 )
 
-# Cache for performance
-@functools.lru_cache(maxsize=100)
-def cached_tool_call(tool_name, query):
-    if tool_name == "Web Search":
-        return web_search(query)
-    elif tool_name == "Calculator":
-        return calculator(query)
-    elif tool_name == "Math Solver":
-        return math_solver(query)
-    elif tool_name == "Document QA":
-        return document_qa(query)
-    return None
+def parse_decision(decision_text: str):
+    """Extract (decision, tool_order) from the controller's reply."""
+    decision = ""
+    tool_order = ""
+    for line in decision_text.strip().split("\n"):
+        if line.startswith("Decision:"):
+            decision = line.replace("Decision:", "").strip()
+        elif line.startswith("Tool Order:"):
+            tool_order = line.replace("Tool Order:", "").strip()
+    return decision, tool_order
+
+async def decide_route(query: str):
+    """Return (decision, tool_order) for query.
+
+    Tries the local pre-router, then the routing cache (keyed by the normalized
+    query, with its own TTL and size cap in the "route" namespace), and only
+    then the controller LLM, whose valid decisions are cached for next time.
+    """
+    with span("routing") as record:
+        decision, tool_order = await route_query(query, record)
+        record["attrs"]["decision"] = decision
+    return decision, tool_order
+
+async def route_query(query: str, record):
+    """The routing steps of decide_route; record["attrs"] receives the method
+    ("pre_router", "cache" or "llm") and the LLM token usage."""
+    decision = pre_route(query)
+    if decision:
+        print(f"Pre-router Decision: {decision}")
+        record["attrs"]["method"] = "pre_router"
+        return decision, ""
+    key = normalize_query(query)
+    try:
+        cached = await asyncio.to_thread(cache_backend.get, ROUTE_NAMESPACE, key)
+        if cached is not None:
+            print(f"Cached Decision: {cached['decision']}")
+            record["attrs"]["method"] = "cache"
+            count_route("cache")
+            return cached["decision"], cached["tool_order"]
+    except Exception as e:
+        print(f"Route cache lookup failed: {e}")
+
+    record["attrs"]["method"] = "llm"
+    count_route("llm")
+    decision, tool_order = await llm_decide(query, record=record)
+    if decision in DECISIONS:
+        try:
+            await asyncio.to_thread(
+                cache_backend.set, ROUTE_NAMESPACE, key, {"decision": decision, "tool_order": tool_order},
+                ROUTE_CACHE_TTL, ROUTE_CACHE_MAX_ENTRIES
+            )
+        except Exception as e:
+            print(f"Route cache store failed: {e}")
+    return decision, tool_order
+
+async def llm_decide(query: str, prompt=None, record=None):
+    """Ask the controller LLM for (decision, tool_order) with prompt (routing_prompt by default).
+
+    Token usage of the call is added to the span record when one is given.
+    """
+    decision_prompt = (prompt or await _alazy("routing_prompt")).format(query=query)
+    decision_resp = await (await _alazy("llm")).ainvoke(decision_prompt)
+    if record is not None:
+        record_llm_usage(record, decision_resp)
+    decision_text = decision_resp.content if hasattr(decision_resp, 'content') else str(decision_resp)
+    print(f"Controller Decision: {decision_text}")
+    return parse_decision(decision_text)
+
+def get_route_cache_stats() -> dict:
+    """Size, hits, misses and hit rate of the routing-decision cache."""
+    return cache_backend.stats().get(ROUTE_NAMESPACE, {"size": 0, "hits": 0, "misses": 0, "hit_rate": 0.0})
+
+async def _route_and_answer(query: str):
+    """Route query and run the chosen tool; returns (result, source, decision)."""
+    try:
+        decision, tool_order = await decide_route(query)
+        return await _answer(query, decision, tool_order)
+    except Exception as e:
+        return (f"Error: {str(e)}", "❌ Error", None)
+
+async def _answer(query: str, decision: str, tool_order: str):
+    """Run the tool for a routing decision; returns (result, source, decision)."""
+    if decision == "CHAIN":
+        with span("chain", tool_order=tool_order) as record:
+            result = (await (await _alazy("agent_executor")).ainvoke(
+                {"input": query}, config={"callbacks": [token_usage_handler(record)]}
+            ))["output"]
+        return (result, f"🔗 Chained Tools: {tool_order}", decision)
+    elif decision in TOOL_ROUTES:
+        tool_name, source = TOOL_ROUTES[decision]
+        result = await cached_tool_call(tool_name, query)
+        return (result, source, decision)
+    else:  # DIRECT or unclear
+        with span("generation", model="llama3-8b-8192") as record:
+            answer = await (await _alazy("llm")).ainvoke(query)
+            record_llm_usage(record, answer)
+        return (answer.content, "🤖 Direct Answer (llama3-8b-8192)", "DIRECT")
+
+async def _stream_answer(query: str, meta: dict):
+    """Yield the answer to query in chunks, filling meta["source"] and meta["route"] first.
+
+    Direct answers and the math solver stream as they are generated; other
+    routes yield their whole result as a single chunk.
+    """
+    decision, tool_order = await decide_route(query)
+    tool_name = TOOL_ROUTES.get(decision, (None,))[0]
+    if tool_name in STREAMING_TOOLS:
+        meta.update(source=TOOL_ROUTES[decision][1], route=decision)
+        async for chunk in cached_tool_stream(tool_name, query):
+            yield chunk
+    elif decision == "CHAIN" or decision in TOOL_ROUTES:
+        result, source, decision = await _answer(query, decision, tool_order)
+        meta.update(source=source, route=decision)
+        yield result
+    else:  # DIRECT or unclear
+        meta.update(source="🤖 Direct Answer (llama3-8b-8192)", route="DIRECT")
+        with span("generation", model="llama3-8b-8192", stream=True) as record:
+            message = None
+            llm = await _alazy("llm")
+            async for chunk in llm.astream(query):
+                message = chunk if message is None else message + chunk
+                if chunk.content:
+                    yield chunk.content
+            if message is not None:
+                record_llm_usage(record, message)
+
+async def _semantic_cache_get(query: str):
+    with span("semantic_cache") as record:
+        try:
+            cached = await asyncio.to_thread(semantic_cache.get, query)
+        except Exception as e:
+            print(f"Semantic cache lookup failed: {e}")
+            cached = None
+        record["attrs"]["hit"] = cached is not None
+    return cached
+
+async def _semantic_cache_put(query: str, result, source: str, decision: str):
+    if not decision or ERROR_RESULT_RE.match(str(result)):
+        return
+    try:
+        await asyncio.to_thread(semantic_cache.put, query, result, source, decision)
+    except Exception as e:
+        print(f"Semantic cache store failed: {e}")
+
+async def aask_agent(query: str):
+    """Route and answer query without blocking; returns (result, source).
+
+    Each call is recorded as a trace with per-stage spans (see agent.tracing).
+    """
+    with trace_request("ask_agent", query=query) as trace:
+        if SEMANTIC_CACHE_ENABLED:
+            cached = await _semantic_cache_get(query)
+            if cached is not None:
+                trace["attrs"].update(route="SEMANTIC_CACHE", source=cached[1])
+                return cached
+        result, source, decision = await _route_and_answer(query)
+        trace["attrs"].update(route=decision or "ERROR", source=source)
+        if SEMANTIC_CACHE_ENABLED:
+            await _semantic_cache_put(query, result, source, decision)
+        return (result, source)
+
+async def astream_agent(query: str, meta: dict = None):
+    """Async-iterate the answer to query as text chunks.
+
+    meta, if given, receives "source" and "route" before the first chunk. The
+    joined chunks are what aask_agent would return, and are cached the same way.
+    """
+    meta = {} if meta is None else meta
+    with trace_request("ask_agent", query=query, stream=True) as trace:
+        start = time.perf_counter()
+        chunks = []
+        try:
+            cached = await _semantic_cache_get(query) if SEMANTIC_CACHE_ENABLED else None
+            if cached is not None:
+                meta.update(source=cached[1], route="SEMANTIC_CACHE")
+                trace["attrs"]["ttft_ms"] = round((time.perf_counter() - start) * 1000, 3)
+                yield cached[0]
+                return
+            async for chunk in _stream_answer(query, meta):
+                if not chunks:
+                    trace["attrs"]["ttft_ms"] = round((time.perf_counter() - start) * 1000, 3)
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            separator = "\n\n" if chunks else ""
+            meta.update(source="❌ Error", route=None)
+            yield f"{separator}Error: {str(e)}"
+            return
+        finally:
+            trace["attrs"].update(route=meta.get("route") or "ERROR", source=meta.get("source"))
+        if SEMANTIC_CACHE_ENABLED:
+            await _semantic_cache_put(query, "".join(chunks), meta.get("source"), meta.get("route"))
+
+class AgentStream:
+    """Synchronous iterator over astream_agent's chunks, for Streamlit and other sync callers.
+
+    source and route are set once the query is routed (before the first chunk)
+    and response holds the full answer after iteration finishes.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.meta = {}
+        self.response = ""
+
+    @property
+    def source(self):
+        return self.meta.get("source", "❌ Error")
+
+    @property
+    def route(self):
+        return self.meta.get("route")
+
+    def __iter__(self):
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for chunk in astream_agent(self.query, self.meta):
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(f"Error: {str(e)}")
+            finally:
+                chunks.put(None)
+
+        submit(pump())
+        parts = []
+        while (chunk := chunks.get()) is not None:
+            parts.append(chunk)
+            yield chunk
+        self.response = "".join(parts)
+
+def stream_agent(query: str) -> AgentStream:
+    """Stream the answer to query: iterate the result for text chunks, then read .source."""
+    return AgentStream(query)
 
 def ask_agent(query: str):
+    """Blocking wrapper around aask_agent for Streamlit and the evaluators."""
     try:
-        decision_prompt = controller_prompt.format(query=query)
-        decision_resp = llm.invoke(decision_prompt)
-        decision_text = decision_resp.content if hasattr(decision_resp, 'content') else str(decision_resp)
-        print(f"Controller Decision: {decision_text}")
-
-        # Parse decision and tool order
-        decision_lines = decision_text.strip().split("\n")
-        decision = ""
-        tool_order = ""
-        for line in decision_lines:
-            if line.startswith("Decision:"):
-                decision = line.replace("Decision:", "").strip()
-            elif line.startswith("Tool Order:"):
-                tool_order = line.replace("Tool Order:", "").strip()
-
-        if decision == "CHAIN":
-            result = agent_executor.invoke({"input": query})["output"]
-            return (result, f"🔗 Chained Tools: {tool_order}")
-        elif decision == "WEB_SEARCH":
-            result = cached_tool_call("Web Search", query)
-            return (result, "🌐 Web Search Tool")
-        elif decision == "CALCULATOR":
-            result = cached_tool_call("Calculator", query)
-            return (result, "🧮 Calculator Tool")
-        elif decision == "MATH_SOLVER":
-            result = cached_tool_call("Math Solver", query)
-            return (result, "➗ Math Solver Tool")
-        elif decision == "DOCUMENT_QA":
-            result = cached_tool_call("Document QA", query)
-            return (result, "📄 Document QA Tool")
-        else:  # DIRECT or unclear
-            answer = llm.invoke(query)
-            return (answer.content, "🤖 Direct Answer (llama3-8b-8192)")
+        return run_sync(aask_agent(query))
     except Exception as e:
-        return (f"Error: {str(e)}", "❌ Error")
\ No newline at end of file
+        return (f"Error: {str(e)}", "❌ Error")
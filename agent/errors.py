@@ -0,0 +1,5 @@
+# type: ignore
+"""Tool and controller errors come back as "<Name> Error: ..." strings rather than exceptions."""
+import re
+
+ERROR_RESULT_RE = re.compile(r"^[\w ]*Error: ")
@@ -0,0 +1,123 @@
+# type: ignore
+"""Aggregate the request traces written by agent.tracing for the Performance page."""
+import time
+from collections import defaultdict
+from agent.tracing import read_traces, trace_files
+from agent.config.settings import TRACE_PATH
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, q: float) -> float:
+    """Linearly interpolated q-th percentile of values (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def load_traces(path: str = TRACE_PATH, since: float = None):
+    """Return recorded traces, including rotated backups, optionally only those started after the since timestamp."""
+    return [trace for file in trace_files(path) for trace in read_traces(file) if since is None or trace["start"] >= since]
+
+
+def _latency_rows(groups):
+    rows = []
+    for name, durations in sorted(groups.items()):
+        row = {"name": name, "count": len(durations), "mean_ms": sum(durations) / len(durations)}
+        for q in PERCENTILES:
+            row[f"p{q}_ms"] = percentile(durations, q)
+        rows.append(row)
+    return rows
+
+
+def latency_by_route(traces):
+    """End-to-end p50/p95/p99 latency per routed tool ("SEMANTIC_CACHE" for cached answers)."""
+    groups = defaultdict(list)
+    for trace in traces:
+        groups[trace["attrs"].get("route", "UNKNOWN")].append(trace["duration_ms"])
+    return _latency_rows(groups)
+
+
+def latency_by_stage(traces):
+    """p50/p95/p99 latency per span name; tool spans are split by tool."""
+    groups = defaultdict(list)
+    for trace in traces:
+        for record in trace["spans"]:
+            name = record["name"]
+            if name == "tool":
+                name = f"tool: {record['attrs'].get('tool', '?')}"
+            groups[name].append(record["duration_ms"])
+    return _latency_rows(groups)
+
+
+def cache_hit_rates(traces):
+    """Hits and lookups for the semantic, route and tool caches, plus pre-router coverage."""
+    counts = {name: [0, 0] for name in ("semantic_cache", "route_cache", "tool_cache", "pre_router")}
+    for trace in traces:
+        for record in trace["spans"]:
+            attrs = record["attrs"]
+            if record["name"] in ("semantic_cache", "tool_cache"):
+                counts[record["name"]][0] += bool(attrs.get("hit"))
+                counts[record["name"]][1] += 1
+            elif record["name"] == "routing":
+                method = attrs.get("method")
+                counts["pre_router"][0] += method == "pre_router"
+                counts["pre_router"][1] += 1
+                if method in ("cache", "llm"):
+                    counts["route_cache"][0] += method == "cache"
+                    counts["route_cache"][1] += 1
+    return [
+        {"cache": name, "hits": hits, "lookups": lookups, "hit_rate": hits / lookups if lookups else 0.0}
+        for name, (hits, lookups) in counts.items()
+    ]
+
+
+def llm_calls_per_query(traces):
+    """Distribution of LLM calls per request as [{"llm_calls", "queries"}], plus the mean."""
+    counts = defaultdict(int)
+    for trace in traces:
+        counts[trace["llm_calls"]] += 1
+    rows = [{"llm_calls": calls, "queries": queries} for calls, queries in sorted(counts.items())]
+    mean = sum(trace["llm_calls"] for trace in traces) / len(traces) if traces else 0.0
+    return rows, mean
+
+
+def throughput(traces, bucket_seconds: int = 60):
+    """Requests, requests/sec and p95 latency per time bucket, ordered by time."""
+    buckets = defaultdict(list)
+    for trace in traces:
+        buckets[int(trace["start"] // bucket_seconds) * bucket_seconds].append(trace["duration_ms"])
+    return [
+        {
+            "time": start,
+            "requests": len(durations),
+            "requests_per_sec": len(durations) / bucket_seconds,
+            "p95_ms": percentile(durations, 95),
+        }
+        for start, durations in sorted(buckets.items())
+    ]
+
+
+def summarize(traces) -> dict:
+    """Headline numbers: request count, latency percentiles, LLM calls and tokens per query."""
+    durations = [trace["duration_ms"] for trace in traces]
+    total = len(traces)
+    summary = {"requests": total}
+    for q in PERCENTILES:
+        summary[f"p{q}_ms"] = percentile(durations, q)
+    summary["llm_calls_per_query"] = sum(t["llm_calls"] for t in traces) / total if total else 0.0
+    summary["tokens_per_query"] = (
+        sum(t["prompt_tokens"] + t["completion_tokens"] for t in traces) / total if total else 0.0
+    )
+    span_seconds = (max(t["start"] for t in traces) - min(t["start"] for t in traces)) if total > 1 else 0.0
+    summary["requests_per_sec"] = total / span_seconds if span_seconds else 0.0
+    return summary
+
+
+def window_start(hours: float = None):
+    """Timestamp hours ago, or None for no limit."""
+    return time.time() - hours * 3600 if hours else None
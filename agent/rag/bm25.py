@@ -0,0 +1,96 @@
+# type: ignore
+"""Okapi BM25 over the indexed chunks, kept next to the FAISS store.
+
+The inverted index maps each term to {docstore id: term frequency}, so chunks
+are added and removed one at a time as sync_index changes the vector store,
+and it is pickled alongside the FAISS files (see index_store.save_vector_store).
+"""
+import heapq
+import math
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was were what when "
+    "where which who why will with".split()
+)
+
+
+def tokenize(text: str):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Incremental BM25 inverted index keyed by docstore id."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> {doc_id: term frequency}
+        self.doc_lengths = {}
+        self.doc_terms = {}  # doc_id -> terms, to find its postings on removal
+        self.total_length = 0
+
+    @classmethod
+    def from_docstore(cls, vector_store, **kwargs):
+        """Index every chunk of a LangChain FAISS store."""
+        index = cls(**kwargs)
+        for doc_id in vector_store.index_to_docstore_id.values():
+            document = vector_store.docstore.search(doc_id)
+            if not isinstance(document, str):
+                index.add(doc_id, document.page_content)
+        return index
+
+    def copy(self):
+        """An independent copy, to update while this one keeps serving searches."""
+        other = BM25Index(self.k1, self.b)
+        other.postings = {term: dict(postings) for term, postings in self.postings.items()}
+        other.doc_lengths = dict(self.doc_lengths)
+        other.doc_terms = dict(self.doc_terms)
+        other.total_length = self.total_length
+        return other
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_lengths
+
+    def add(self, doc_id: str, text: str):
+        if doc_id in self.doc_lengths:
+            return
+        counts = Counter(tokenize(text))
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        length = sum(counts.values())
+        self.doc_lengths[doc_id] = length
+        self.doc_terms[doc_id] = tuple(counts)
+        self.total_length += length
+
+    def remove(self, doc_id: str):
+        if doc_id not in self.doc_lengths:
+            return
+        for term in self.doc_terms.pop(doc_id):
+            postings = self.postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def search(self, query: str, k: int = 20):
+        """Top k (doc_id, score) pairs for query, best first."""
+        count = len(self.doc_lengths)
+        if not count:
+            return []
+        average_length = self.total_length / count or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,133 @@
+# type: ignore
+"""Chunk de-duplication for ingestion: exact content hashes plus SimHash for near-duplicates.
+
+Every indexed chunk is registered under its docstore id with the files it
+came from, so a chunk seen again in another file is mapped to the existing
+vector instead of being embedded twice, and a vector is only deleted once the
+last file referencing it is gone.
+"""
+import hashlib
+import re
+import uuid
+from collections import defaultdict
+
+DEDUP_MODES = ("off", "exact", "near")
+TOKEN_RE = re.compile(r"\w+")
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+# Fingerprints are looked up by 16-bit band: two within 3 differing bits share at least one band
+BANDS = 4
+BAND_BITS = SIMHASH_BITS // BANDS
+# Very short chunks share too few shingles for SimHash to tell them apart reliably
+MIN_NEAR_TOKENS = 20
+
+
+def tokenize(text: str):
+    return TOKEN_RE.findall(text.lower())
+
+
+def content_hash(text: str) -> str:
+    """sha256 of the chunk text with case, punctuation and whitespace normalized away."""
+    return hashlib.sha256(" ".join(tokenize(text)).encode("utf-8")).hexdigest()
+
+
+def simhash(tokens) -> int:
+    """64-bit SimHash over word shingles of tokens."""
+    shingles = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))]
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(fingerprint: int):
+    mask = (1 << BAND_BITS) - 1
+    return [(band, fingerprint >> (band * BAND_BITS) & mask) for band in range(BANDS)]
+
+
+class ChunkDeduplicator:
+    """Registry of indexed chunks ({id: {"sha256", "simhash", "sources"}}) that assigns ids to new chunks.
+
+    mode "exact" reuses the id of a chunk with the same normalized text,
+    "near" also that of a chunk whose SimHash is within max_distance bits, and
+    "off" gives every chunk a new id while still tracking its sources.
+    max_distance is capped at BANDS - 1, the most the band lookup is
+    guaranteed to find.
+    """
+
+    def __init__(self, chunks: dict = None, mode: str = "near", max_distance: int = 3):
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode {mode!r}; expected one of {DEDUP_MODES}")
+        self.mode = mode
+        self.max_distance = min(max_distance, BANDS - 1)
+        self.chunks = {}
+        self._by_hash = {}
+        self._by_band = defaultdict(set)
+        for chunk_id, entry in (chunks or {}).items():
+            self._register(chunk_id, {**entry, "sources": list(entry.get("sources", []))})
+
+    def _register(self, chunk_id: str, entry: dict):
+        self.chunks[chunk_id] = entry
+        self._by_hash.setdefault(entry["sha256"], chunk_id)
+        if entry.get("simhash"):
+            for band in _bands(int(entry["simhash"], 16)):
+                self._by_band[band].add(chunk_id)
+
+    def _unregister(self, chunk_id: str):
+        entry = self.chunks.pop(chunk_id)
+        if self._by_hash.get(entry["sha256"]) == chunk_id:
+            del self._by_hash[entry["sha256"]]
+        if entry.get("simhash"):
+            for band in _bands(int(entry["simhash"], 16)):
+                self._by_band[band].discard(chunk_id)
+
+    def _near_match(self, fingerprint: int):
+        candidates = set()
+        for band in _bands(fingerprint):
+            candidates |= self._by_band.get(band, set())
+        best, best_distance = None, self.max_distance + 1
+        for chunk_id in candidates:
+            distance = hamming(fingerprint, int(self.chunks[chunk_id]["simhash"], 16))
+            if distance < best_distance:
+                best, best_distance = chunk_id, distance
+        return best
+
+    def assign(self, text: str, source: str):
+        """Return (chunk_id, kind) for a chunk of source; kind is None for a new chunk, else "exact" or "near"."""
+        digest = content_hash(text)
+        tokens = tokenize(text)
+        fingerprint = simhash(tokens) if self.mode == "near" and len(tokens) >= MIN_NEAR_TOKENS else None
+        chunk_id, kind = None, None
+        if self.mode != "off":
+            chunk_id, kind = self._by_hash.get(digest), "exact"
+            if chunk_id is None and fingerprint is not None:
+                chunk_id, kind = self._near_match(fingerprint), "near"
+        if chunk_id is not None:
+            if source not in self.chunks[chunk_id]["sources"]:
+                self.chunks[chunk_id]["sources"].append(source)
+            return chunk_id, kind
+        chunk_id = uuid.uuid4().hex
+        self._register(chunk_id, {
+            "sha256": digest,
+            "simhash": f"{fingerprint:016x}" if fingerprint is not None else None,
+            "sources": [source],
+        })
+        return chunk_id, None
+
+    def remove_source(self, chunk_id: str, source: str) -> bool:
+        """Drop source from a chunk; True if no file references the chunk any more (delete its vector)."""
+        entry = self.chunks.get(chunk_id)
+        if entry is None:
+            return True
+        if source in entry["sources"]:
+            entry["sources"].remove(source)
+        if entry["sources"]:
+            return False
+        self._unregister(chunk_id)
+        return True
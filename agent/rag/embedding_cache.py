@@ -0,0 +1,117 @@
+# type: ignore
+"""Persistent cache of chunk embeddings, so rebuilds only embed text that was never seen.
+
+Vectors are stored as float32 blobs in SQLite, keyed by the embedding model
+and the sha256 of the exact chunk text. The file is shared by every worker
+process and survives index rebuilds, re-chunking and index-type changes.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Stays below SQLite's default limit on bound parameters per statement
+LOOKUP_BATCH = 500
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite blob store of vectors keyed by (model, sha256 of text)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, key TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, key))"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model: str, keys) -> dict:
+        """Return {key: vector} for the keys that are cached for model."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        conn = self._connect()
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({','.join('?' * len(batch))})",
+                (model, *batch),
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model: str, items):
+        """Store (key, vector) pairs for model."""
+        rows = [
+            (model, key, len(vector), np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in items
+        ]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings (model, key, dim, vector) VALUES (?, ?, ?, ?)", rows)
+
+    def clear(self, model: str = None):
+        with self._connect() as conn:
+            if model:
+                conn.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+            else:
+                conn.execute("DELETE FROM embeddings")
+
+    def stats(self) -> dict:
+        """Per-model {"vectors", "bytes"}."""
+        rows = self._connect().execute(
+            "SELECT model, COUNT(*), SUM(LENGTH(vector)) FROM embeddings GROUP BY model"
+        ).fetchall()
+        return {model: {"vectors": count, "bytes": size or 0} for model, count, size in rows}
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings that answer embed_documents from an EmbeddingCache and embed only the misses.
+
+    Queries are passed straight through; they rarely repeat and the semantic
+    cache already sits in front of them.
+    """
+
+    def __init__(self, embeddings, cache: EmbeddingCache, model: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        keys = [text_key(text) for text in texts]
+        found = self.cache.get_many(self.model, keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing, vectors))
+            self.cache.put_many(self.model, fresh.items())
+            found.update(fresh)
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+        return [list(found[key]) for key in keys]
+
+    def embed_query(self, text: str):
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,61 @@
+# type: ignore
+"""Hybrid retriever for document_qa: FAISS dense search and BM25 fused by reciprocal rank."""
+import asyncio
+from typing import Any, List
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60):
+    """Fuse ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda doc_id: -scores[doc_id])
+
+
+class HybridRetriever(BaseRetriever):
+    """Top k chunks by RRF over the fetch_k best dense and fetch_k best BM25 matches.
+
+    The BM25 index is vector_store.bm25, kept in step with the store by
+    sync_index; without one this is plain dense retrieval. Both rankings are
+    docstore ids (index_to_docstore_id), which every LangChain FAISS store
+    has, unlike Document.id.
+    """
+
+    vector_store: Any
+    k: int = 3
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _dense(self, query: str):
+        store = self.vector_store
+        vector = np.asarray([store._embed_query(query)], dtype=np.float32)
+        if getattr(store, "_normalize_L2", False):
+            import faiss
+
+            faiss.normalize_L2(vector)
+        _, positions = store.index.search(vector, self.fetch_k)
+        # FAISS pads with -1 when the index holds fewer than fetch_k vectors
+        return [store.index_to_docstore_id[int(p)] for p in positions[0] if int(p) in store.index_to_docstore_id]
+
+    def _sparse(self, query: str):
+        bm25 = getattr(self.vector_store, "bm25", None)
+        if bm25 is None or not len(bm25):
+            return None
+        return [doc_id for doc_id, _ in bm25.search(query, self.fetch_k)]
+
+    def _fuse(self, dense, sparse) -> List[Document]:
+        fused = dense[:self.k] if sparse is None else reciprocal_rank_fusion([dense, sparse], self.rrf_k)[:self.k]
+        documents = [self.vector_store.docstore.search(doc_id) for doc_id in fused]
+        return [document for document in documents if isinstance(document, Document)]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self._fuse(self._dense(query), self._sparse(query))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        # Dense and BM25 search run side by side in worker threads, off the event loop
+        dense, sparse = await asyncio.gather(asyncio.to_thread(self._dense, query), asyncio.to_thread(self._sparse, query))
+        return self._fuse(dense, sparse)
@@ -0,0 +1,237 @@
+# type: ignore
+import hashlib
+import json
+import os
+import pickle
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+MANIFEST_VERSION = 3
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+BM25_FILE = "bm25.pkl"
+
+
+def file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    """Return the sha256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_sources(documents_dir: str, previous: dict = None) -> dict:
+    """Describe every supported file under documents_dir, keyed by relative path.
+
+    Files whose size and mtime match the previous manifest reuse its hash, so a
+    warm start does not re-read the whole corpus.
+    """
+    known = (previous or {}).get("files", {})
+    sources = {}
+    for root, _, files in os.walk(documents_dir):
+        for file in sorted(files):
+            if not file.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            file_path = os.path.join(root, file)
+            rel_path = os.path.relpath(file_path, documents_dir).replace(os.sep, "/")
+            stat = os.stat(file_path)
+            entry = known.get(rel_path)
+            if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+                sha256 = entry["sha256"]
+            else:
+                sha256 = file_sha256(file_path)
+            sources[rel_path] = {"sha256": sha256, "size": stat.st_size, "mtime": stat.st_mtime}
+    return sources
+
+
+def build_manifest(sources: dict, embedding_model: str, chunk_size: int, chunk_overlap: int, chunks: dict = None,
+                   index_type: str = "flat") -> dict:
+    """Manifest of the indexed files and of every chunk's content hashes and source files."""
+    return {
+        "version": MANIFEST_VERSION,
+        "embedding_model": embedding_model,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "index_type": index_type,
+        "files": sources,
+        "chunks": chunks or {},
+    }
+
+
+def index_generation(index_dir: str) -> int:
+    """A value that changes whenever save_vector_store writes index_dir (the manifest's mtime in ns), 0 if unsaved.
+
+    Lets every process notice an index saved by another one.
+    """
+    try:
+        return os.stat(os.path.join(index_dir, MANIFEST_FILE)).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def settings_match(manifest: dict, embedding_model: str, chunk_size: int, chunk_overlap: int) -> bool:
+    """True if a persisted index was built with these embedding and chunking settings."""
+    if not manifest or manifest.get("version") != MANIFEST_VERSION:
+        return False
+    return (manifest.get("embedding_model"), manifest.get("chunk_size"), manifest.get("chunk_overlap")) == (
+        embedding_model, chunk_size, chunk_overlap
+    )
+
+
+def load_manifest(index_dir: str):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading index manifest {path}: {e}")
+        return None
+
+
+def _replace_atomically(path: str, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_vector_store(vector_store, index_dir: str, manifest: dict):
+    """Persist the FAISS index, its docstore, its BM25 index and the source manifest.
+
+    Each file is written to a temporary name and swapped in, and the manifest is
+    written last so a crash mid-save never leaves a manifest describing a
+    half-written index.
+    """
+    import faiss
+
+    os.makedirs(index_dir, exist_ok=True)
+
+    def write_index(path):
+        faiss.write_index(vector_store.index, path)
+
+    def write_docstore(path):
+        with open(path, "wb") as f:
+            pickle.dump((vector_store.docstore, vector_store.index_to_docstore_id), f)
+
+    def write_bm25(path):
+        with open(path, "wb") as f:
+            pickle.dump(vector_store.bm25, f)
+
+    def write_manifest(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    _replace_atomically(os.path.join(index_dir, INDEX_FILE), write_index)
+    _replace_atomically(os.path.join(index_dir, DOCSTORE_FILE), write_docstore)
+    if getattr(vector_store, "bm25", None) is not None:
+        _replace_atomically(os.path.join(index_dir, BM25_FILE), write_bm25)
+    _replace_atomically(os.path.join(index_dir, MANIFEST_FILE), write_manifest)
+
+
+def is_memory_mapped(index) -> bool:
+    """True if the index's vectors are read from a memory-mapped file instead of loaded into RAM.
+
+    FAISS maps IVF inverted lists with IO_FLAG_MMAP, and flat codes (also the
+    storage of an HNSW index) only with IO_FLAG_MMAP_IFC (FAISS >= 1.10);
+    anything else is read fully even when a mapped read was requested.
+    """
+    import faiss
+
+    storage = getattr(index, "storage", None)
+    for candidate in (index, faiss.downcast_index(storage) if storage is not None else None):
+        codes = getattr(candidate, "codes", None)
+        if codes is not None and hasattr(codes, "is_owned"):
+            return not codes.is_owned
+    if isinstance(index, faiss.IndexIVF) and hasattr(faiss, "downcast_InvertedLists"):
+        invlists = faiss.downcast_InvertedLists(faiss.extract_index_ivf(index).invlists)
+        return isinstance(invlists, faiss.OnDiskInvertedLists)
+    return False
+
+
+def load_vector_store(index_dir: str, embeddings, mmap: bool = True):
+    """Load a persisted FAISS store, memory-mapping the index when FAISS supports it.
+
+    vector_store.index_mmapped records whether the index really is mapped
+    (see is_memory_mapped), so ensure_writable only copies mapped indexes.
+
+    The pickles are only ever ones we wrote ourselves via save_vector_store.
+    A missing BM25 index leaves vector_store.bm25 as None for sync_index to build.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    index_path = os.path.join(index_dir, INDEX_FILE)
+    index = None
+    mmapped = False
+    # Flat codes (the default index) first; IVF indexes need the other flag and are read twice
+    mmap_flags = [flag for flag in (getattr(faiss, "IO_FLAG_MMAP_IFC", None), faiss.IO_FLAG_MMAP) if flag]
+    for flag in mmap_flags if mmap else ():
+        try:
+            index = faiss.read_index(index_path, flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            continue
+        mmapped = is_memory_mapped(index)
+        if mmapped:
+            break
+    if not mmapped:
+        index = faiss.read_index(index_path) if index is None else index
+    with open(os.path.join(index_dir, DOCSTORE_FILE), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    vector_store = FAISS(embeddings, index, docstore, index_to_docstore_id)
+    vector_store.index_mmapped = mmapped
+    vector_store.index_path = index_path
+    vector_store.bm25 = None
+    bm25_path = os.path.join(index_dir, BM25_FILE)
+    if os.path.exists(bm25_path):
+        with open(bm25_path, "rb") as f:
+            vector_store.bm25 = pickle.load(f)
+    return vector_store
+
+
+def _index_in_memory(vector_store):
+    """A writable in-memory copy of vector_store's index.
+
+    A mapped index is read again from its file: clone_index keeps mapped flat
+    codes as a view and cannot clone on-disk IVF lists. The search parameters
+    set on the mapped index carry over.
+    """
+    import faiss
+    from agent.rag.index_types import index_type_of
+
+    if not getattr(vector_store, "index_mmapped", False):
+        return faiss.clone_index(vector_store.index)
+    mapped = vector_store.index
+    index = faiss.read_index(vector_store.index_path)
+    kind = index_type_of(index)
+    if kind == "hnsw":
+        index.hnsw.efSearch = mapped.hnsw.efSearch
+    elif kind != "flat":
+        faiss.extract_index_ivf(index).nprobe = faiss.extract_index_ivf(mapped).nprobe
+    return index
+
+
+def ensure_writable(vector_store):
+    """Replace a memory-mapped, read-only index with an in-memory copy before it is modified."""
+    if getattr(vector_store, "index_mmapped", False):
+        vector_store.index = _index_in_memory(vector_store)
+        vector_store.index_mmapped = False
+
+
+def copy_vector_store(vector_store):
+    """A copy of vector_store to modify while the original keeps serving searches.
+
+    The index is copied into memory and the docstore and id mapping are new
+    dicts over the same Document objects, which are replaced rather than
+    edited (see ingest.set_chunk_sources).
+    """
+    import copy
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+
+    store = copy.copy(vector_store)
+    store.index = _index_in_memory(vector_store)
+    store.index_mmapped = False
+    store.docstore = InMemoryDocstore(dict(vector_store.docstore._dict))
+    store.index_to_docstore_id = dict(vector_store.index_to_docstore_id)
+    return store
@@ -0,0 +1,144 @@
+# type: ignore
+"""FAISS index types for document_qa beyond the exact flat index.
+
+"ivf_flat", "ivf_pq" and "ivf_sq" cluster the vectors into nlist inverted
+lists trained on a sample (train_size) and search nprobe of them; "ivf_pq"
+and "ivf_sq" also compress the stored vectors (product or scalar
+quantization). "hnsw" is a graph index searched with ef_search candidates.
+All use L2 distance like LangChain's default flat index, and keep LangChain's
+positional ids, so only the flat index can delete vectors in place; the others
+are rebuilt instead (rebuild_store). IVF indexes are trained for the corpus
+size at the time, so needs_rebuild retrains them as the corpus grows.
+"""
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq", "ivf_sq")
+# k-means wants about 39 training points per centroid before FAISS warns
+MIN_POINTS_PER_CENTROID = 39
+# An IVF index is retrained once the corpus supports this many times its nlist
+RETRAIN_GROWTH = 2
+
+
+def index_type_of(index) -> str:
+    import faiss
+
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFScalarQuantizer):
+        return "ivf_sq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def set_search_params(index, params: dict):
+    """Apply nprobe (IVF types) or ef_search (HNSW) to a built or loaded index."""
+    import faiss
+
+    kind = index_type_of(index)
+    if kind == "hnsw":
+        index.hnsw.efSearch = params["ef_search"]
+    elif kind != "flat":
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+
+
+def _pq_subquantizers(dim: int, wanted: int) -> int:
+    """Largest divisor of dim that is at most wanted."""
+    return max(m for m in range(1, min(dim, wanted) + 1) if dim % m == 0)
+
+
+def trainable_type(index_type: str, count: int, params: dict) -> str:
+    """The type build_index builds for count vectors: "flat" when too few to train ivf_pq codebooks."""
+    if index_type == "ivf_pq" and count < 2 ** params["pq_nbits"]:
+        return "flat"
+    return index_type
+
+
+def ivf_lists(count: int, params: dict) -> int:
+    """nlist for an IVF index trained on count vectors."""
+    return max(1, min(params["nlist"], count // MIN_POINTS_PER_CENTROID))
+
+
+def needs_rebuild(index, index_type: str, params: dict) -> bool:
+    """True if index should be rebuilt as index_type at its current size.
+
+    Another type is rebuilt once index_type can be trained (a small store stays
+    on the flat fallback instead of being rebuilt on every upload), and an IVF
+    index once the corpus supports RETRAIN_GROWTH times its nlist.
+    """
+    import faiss
+
+    kind = index_type_of(index)
+    if kind != index_type:
+        return trainable_type(index_type, index.ntotal, params) != kind
+    if kind in ("flat", "hnsw"):
+        return False
+    return ivf_lists(index.ntotal, params) >= RETRAIN_GROWTH * faiss.extract_index_ivf(index).nlist
+
+
+def build_index(vectors, index_type: str, params: dict, seed: int = 0):
+    """Build, train (on a sample of at most train_size vectors) and fill an index of index_type.
+
+    Falls back to a flat index when there are too few vectors to train the
+    requested one.
+    """
+    import faiss
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    if trainable_type(index_type, count, params) != index_type:
+        print(f"{count} vectors are too few to train ivf_pq codebooks, using a flat index")
+        index_type = "flat"
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["hnsw_m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+    else:
+        nlist = ivf_lists(count, params)
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        elif index_type == "ivf_sq":
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, getattr(faiss.ScalarQuantizer, params["sq_type"]))
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim, params["pq_m"]), params["pq_nbits"])
+        sample = vectors
+        if count > params["train_size"]:
+            sample = vectors[np.random.default_rng(seed).choice(count, params["train_size"], replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    set_search_params(index, params)
+    return index
+
+
+def rebuild_store(vector_store, embeddings, index_type: str, params: dict, drop=()):
+    """Replace vector_store's index with a new index_type index, leaving out the docstore ids in drop.
+
+    Vectors are read back from a flat index, which stores them exactly; for
+    any other index the chunk texts are embedded again, which the embedding
+    cache answers without running the model.
+    """
+    drop = set(drop)
+    index = vector_store.index
+    keep = [(position, doc_id) for position, doc_id in sorted(vector_store.index_to_docstore_id.items())
+            if doc_id not in drop]
+    if not keep:
+        vectors = np.zeros((0, index.d), dtype=np.float32)
+    elif index_type_of(index) == "flat":
+        vectors = index.reconstruct_n(0, index.ntotal)[[position for position, _ in keep]]
+    else:
+        texts = [vector_store.docstore.search(doc_id).page_content for _, doc_id in keep]
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    vector_store.index = build_index(vectors, index_type if keep else "flat", params)
+    vector_store.index_to_docstore_id = {position: doc_id for position, (_, doc_id) in enumerate(keep)}
+    stale = [doc_id for doc_id in drop if doc_id in vector_store.docstore._dict]
+    if stale:
+        vector_store.docstore.delete(stale)
+    vector_store.index_mmapped = False
+    return vector_store
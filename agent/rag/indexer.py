@@ -0,0 +1,112 @@
+# type: ignore
+import os
+from agent.rag.index_store import scan_sources, build_manifest, settings_match, ensure_writable, copy_vector_store
+from agent.rag.ingest import ingest_files, set_chunk_sources
+from agent.rag.dedup import ChunkDeduplicator
+from agent.rag.index_types import index_type_of, needs_rebuild, rebuild_store
+from agent.rag.bm25 import BM25Index
+
+
+def diff_sources(indexed: dict, sources: dict):
+    """Split the corpus into (added, modified, deleted) relative paths by content hash."""
+    added = [path for path in sources if path not in indexed]
+    modified = [path for path in sources if path in indexed and indexed[path]["sha256"] != sources[path]["sha256"]]
+    deleted = [path for path in indexed if path not in sources]
+    return added, modified, deleted
+
+
+def sync_index(vector_store, manifest, documents_dir: str, embeddings, embedding_model: str, chunk_size: int, chunk_overlap: int,
+               workers: int = 1, batch_size: int = 64, dedup_mode: str = "near", max_distance: int = 3,
+               index_type: str = "flat", index_params: dict = None):
+    """Bring vector_store in line with documents_dir, embedding only what changed.
+
+    Vectors of modified and deleted files are removed by their docstore ids and
+    new or modified files are streamed through ingest_files (workers parser
+    processes, batch_size chunks per embedding call) into the store. Chunks are
+    de-duplicated across files (dedup_mode, see ChunkDeduplicator): a vector
+    shared by several files is only removed with the last of them. If the
+    manifest was built with different settings (or there is no store yet) every
+    file counts as added.
+
+    New stores are filled as flat indexes and then rebuilt as index_type
+    (see agent.rag.index_types) with index_params; a store whose index cannot
+    delete in place is rebuilt without the stale vectors, and one built as
+    another type, or an IVF index that has outgrown its nlist, is rebuilt once
+    needs_rebuild says so. The store's BM25 index (vector_store.bm25) gets
+    the same chunk additions and removals, and is built from the docstore when
+    the store has none. Returns (vector_store, manifest, stats).
+
+    When anything changes, the work is done on a copy (copy_vector_store) and
+    the returned store is a new object: the one passed in is never modified,
+    so searches running on it meanwhile are unaffected, and the caller swaps
+    the new store in.
+    """
+    if vector_store is None or not settings_match(manifest, embedding_model, chunk_size, chunk_overlap):
+        vector_store, manifest = None, None
+    indexed = (manifest or {}).get("files", {})
+    sources = scan_sources(documents_dir, manifest)
+    added, modified, deleted = diff_sources(indexed, sources)
+    stats = {"added": len(added), "modified": len(modified), "deleted": len(deleted), "chunks_added": 0, "chunks_removed": 0}
+    dedup = ChunkDeduplicator((manifest or {}).get("chunks"), mode=dedup_mode, max_distance=max_distance)
+    type_changed = (manifest or {}).get("index_type", "flat") != index_type
+    if vector_store is not None and (added or modified or deleted or type_changed):
+        vector_store = copy_vector_store(vector_store)
+
+    stale_ids = []
+    for path in modified + deleted:
+        for doc_id in indexed[path].get("ids", []):
+            if dedup.remove_source(doc_id, path):
+                stale_ids.append(doc_id)
+            else:
+                remaining = dedup.chunks[doc_id]["sources"]
+                set_chunk_sources(vector_store, doc_id, remaining, os.path.join(documents_dir, *remaining[0].split("/")))
+    to_ingest = {path: os.path.join(documents_dir, *path.split("/")) for path in added + modified}
+    bm25 = getattr(vector_store, "bm25", None)
+    if bm25 is not None and (stale_ids or to_ingest):
+        bm25 = bm25.copy()  # copy_vector_store shares it with the live store
+
+    if vector_store is not None and stale_ids:
+        if bm25 is not None:
+            for doc_id in stale_ids:
+                bm25.remove(doc_id)
+        if index_type_of(vector_store.index) == "flat":
+            ensure_writable(vector_store)
+            vector_store.delete(stale_ids)
+        else:
+            vector_store = rebuild_store(vector_store, embeddings, index_type, index_params, drop=stale_ids)
+            stats["index_rebuilt"] = index_type
+        stats["chunks_removed"] = len(stale_ids)
+
+    files = {}
+    for path, entry in sources.items():
+        if path in indexed and path not in modified:
+            files[path] = {**entry, "ids": indexed[path].get("ids", [])}
+
+    if to_ingest:
+        vector_store, ids, ingest_stats = ingest_files(
+            to_ingest, vector_store, embeddings, chunk_size, chunk_overlap, workers=workers, batch_size=batch_size,
+            dedup=dedup
+        )
+        for path, chunk_ids in ids.items():
+            files[path] = {**sources[path], "ids": chunk_ids}
+        stats["chunks_added"] = ingest_stats["embedded"]
+        stats["duplicate_chunks"] = ingest_stats["duplicate_chunks"]
+        stats["ingest"] = ingest_stats
+        if bm25 is not None:
+            for chunk_ids in ids.values():
+                for doc_id in chunk_ids:
+                    if doc_id not in bm25:
+                        bm25.add(doc_id, vector_store.docstore.search(doc_id).page_content)
+
+    if vector_store is not None:
+        if bm25 is None:
+            bm25 = BM25Index.from_docstore(vector_store)
+            stats["bm25_built"] = True
+        vector_store.bm25 = bm25
+
+    if vector_store is not None and (to_ingest or type_changed) and needs_rebuild(vector_store.index, index_type, index_params):
+        vector_store = rebuild_store(vector_store, embeddings, index_type, index_params)
+        stats["index_rebuilt"] = index_type
+
+    manifest = build_manifest(files, embedding_model, chunk_size, chunk_overlap, dedup.chunks, index_type)
+    return vector_store, manifest, stats
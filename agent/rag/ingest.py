@@ -0,0 +1,245 @@
+# type: ignore
+"""Streaming ingestion of documents into a FAISS store.
+
+Files are parsed in a process pool with a bounded number in flight, split into
+chunks as their pages arrive, and the chunks are embedded batch_size at a time
+and added to the store incrementally, so memory stays bounded by the parse
+window and one embedding batch rather than the whole corpus. With a
+ChunkDeduplicator, chunks already in the store (exact or near duplicates) are
+mapped to the existing vector and not embedded again.
+
+A throughput report for a documents folder (built in memory, nothing is saved):
+
+    python -m agent.rag.ingest --documents data/documents --workers 4 --batch-size 64
+"""
+import argparse
+import copy
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from langchain_community.document_loaders.pdf import PyPDFLoader
+from langchain_community.document_loaders.text import TextLoader
+from langchain_community.document_loaders.word_document import Docx2txtLoader
+from langchain_community.vectorstores import FAISS
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from agent.rag.index_store import SUPPORTED_EXTENSIONS, ensure_writable
+from agent.rag.dedup import ChunkDeduplicator
+
+
+def load_document(file_path: str):
+    """Load a single PDF/DOCX/TXT file into LangChain documents."""
+    ext = file_path.lower()
+    if ext.endswith(".pdf"):
+        return PyPDFLoader(file_path).load()
+    if ext.endswith(".docx"):
+        return Docx2txtLoader(file_path).load()
+    if ext.endswith(".txt"):
+        return TextLoader(file_path).load()
+    return []
+
+
+def _parse_serially(file_paths):
+    for file_path in file_paths:
+        try:
+            yield file_path, load_document(file_path)
+        except Exception as e:
+            yield file_path, e
+
+
+def iter_parsed(file_paths, workers: int = 1):
+    """Yield (file_path, documents) as files finish parsing, in completion order.
+
+    With workers > 1 the files are parsed in a process pool with at most
+    2 * workers submitted at a time. The pool spawns its workers: the app
+    ingests from a threaded process, and a forked child could inherit a lock
+    another thread was holding. A file that fails to parse yields its
+    exception in place of the documents.
+    """
+    file_paths = list(file_paths)
+    if workers <= 1 or len(file_paths) <= 1:
+        yield from _parse_serially(file_paths)
+        return
+    try:
+        pool = ProcessPoolExecutor(
+            max_workers=min(workers, len(file_paths)), mp_context=multiprocessing.get_context("spawn")
+        )
+    except (OSError, NotImplementedError) as e:
+        print(f"Process pool unavailable, parsing in-process: {e}")
+        yield from _parse_serially(file_paths)
+        return
+    remaining = iter(file_paths)
+    with pool:
+        pending = {pool.submit(load_document, path): path for path in itertools.islice(remaining, 2 * workers)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path = pending.pop(future)
+                try:
+                    yield file_path, future.result()
+                except Exception as e:
+                    yield file_path, e
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    pending[pool.submit(load_document, next_path)] = next_path
+
+
+class BatchEmbedder:
+    """Buffers chunks and embeds them batch_size at a time into a FAISS store.
+
+    The store is created from the first batch when vector_store is None.
+    """
+
+    def __init__(self, vector_store, embeddings, batch_size: int, stats: dict):
+        self.vector_store = vector_store
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.stats = stats
+        self._chunks = []
+        self._ids = []
+
+    def add(self, chunks, ids):
+        self._chunks.extend(chunks)
+        self._ids.extend(ids)
+        while len(self._chunks) >= self.batch_size:
+            self._embed(self.batch_size)
+
+    def flush(self):
+        if self._chunks:
+            self._embed(len(self._chunks))
+        return self.vector_store
+
+    def _embed(self, count: int):
+        chunks, self._chunks = self._chunks[:count], self._chunks[count:]
+        ids, self._ids = self._ids[:count], self._ids[count:]
+        texts = [chunk.page_content for chunk in chunks]
+        metadatas = [chunk.metadata for chunk in chunks]
+        start = time.perf_counter()
+        hits = getattr(self.embeddings, "hits", 0)
+        vectors = self.embeddings.embed_documents(texts)
+        self.stats["embed_seconds"] += time.perf_counter() - start
+        self.stats["embedding_cache_hits"] += getattr(self.embeddings, "hits", 0) - hits
+        text_embeddings = list(zip(texts, vectors))
+        if self.vector_store is None:
+            self.vector_store = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=ids)
+        else:
+            ensure_writable(self.vector_store)
+            self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        self.stats["batches"] += 1
+        self.stats["embedded"] += len(chunks)
+
+
+def set_chunk_sources(vector_store, chunk_id: str, sources, source_path: str = None):
+    """Record the files a shared chunk belongs to in its docstore metadata.
+
+    source_path replaces the chunk's "source" when the file it was loaded from
+    no longer references it. The Document is replaced, not edited, because a
+    store being synced shares Document objects with the one serving searches.
+    """
+    document = vector_store.docstore.search(chunk_id) if vector_store is not None else None
+    if document is None or isinstance(document, str):
+        return
+    metadata = {**document.metadata, "sources": list(sources)}
+    if source_path is not None:
+        metadata["source"] = source_path
+    document = copy.copy(document)
+    document.metadata = metadata
+    vector_store.docstore._dict[chunk_id] = document
+
+
+def ingest_files(files: dict, vector_store, embeddings, chunk_size: int, chunk_overlap: int, workers: int = 1,
+                 batch_size: int = 64, dedup: ChunkDeduplicator = None):
+    """Parse, chunk and embed files ({relative path: file path}) into vector_store.
+
+    Returns (vector_store, ids, stats) where ids maps each relative path that
+    was ingested to the docstore ids of its chunks; duplicate chunks share an
+    id and are registered in dedup. Files that fail to parse are reported and
+    left out of ids.
+    """
+    stats = {
+        "files": 0, "pages": 0, "chunks": 0, "duplicate_chunks": 0, "embedded": 0, "embedding_cache_hits": 0,
+        "batches": 0, "embed_seconds": 0.0, "seconds": 0.0,
+    }
+    dedup = dedup if dedup is not None else ChunkDeduplicator(mode="off")
+    shared = set()
+    start = time.perf_counter()
+    rel_paths = {file_path: rel_path for rel_path, file_path in files.items()}
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    embedder = BatchEmbedder(vector_store, embeddings, batch_size, stats)
+    ids = {}
+    for file_path, pages in iter_parsed(files.values(), workers):
+        if isinstance(pages, Exception):
+            print(f"Error loading {file_path}: {pages}")
+            continue
+        rel_path = rel_paths[file_path]
+        chunks = text_splitter.split_documents(pages)
+        chunk_ids, new_chunks, new_ids = [], [], []
+        for chunk in chunks:
+            chunk_id, duplicate = dedup.assign(chunk.page_content, rel_path)
+            if duplicate:
+                stats["duplicate_chunks"] += 1
+                shared.add(chunk_id)
+            else:
+                chunk.metadata["sources"] = [rel_path]
+                new_chunks.append(chunk)
+                new_ids.append(chunk_id)
+            chunk_ids.append(chunk_id)
+        embedder.add(new_chunks, new_ids)
+        ids[rel_path] = list(dict.fromkeys(chunk_ids))
+        stats["files"] += 1
+        stats["pages"] += len(pages)
+        stats["chunks"] += len(chunks)
+    vector_store = embedder.flush()
+    for chunk_id in shared:
+        set_chunk_sources(vector_store, chunk_id, dedup.chunks[chunk_id]["sources"])
+    stats["seconds"] = time.perf_counter() - start
+    stats["pages_per_sec"] = stats["pages"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["chunks_per_sec"] = stats["chunks"] / stats["seconds"] if stats["seconds"] else 0.0
+    return vector_store, ids, stats
+
+
+def format_throughput(stats: dict) -> str:
+    return (
+        f"{stats['files']} files, {stats['pages']} pages, {stats['chunks']} chunks in {stats['seconds']:.2f}s "
+        f"({stats['pages_per_sec']:.1f} pages/s, {stats['chunks_per_sec']:.1f} chunks/s; "
+        f"{stats['duplicate_chunks']} duplicates skipped, {stats['embedded']} embedded "
+        f"({stats['embedding_cache_hits']} from the embedding cache) in "
+        f"{stats['embed_seconds']:.2f}s over {stats['batches']} batches)"
+    )
+
+
+def main():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from agent.config.settings import (
+        DOCUMENTS_DIR, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, INGEST_WORKERS, EMBED_BATCH_SIZE, DEDUP_MODE,
+        DEDUP_MAX_DISTANCE, EMBEDDING_CACHE_PATH
+    )
+    from agent.rag.embedding_cache import EmbeddingCache, CachedEmbeddings
+
+    parser = argparse.ArgumentParser(description="Ingestion throughput for a documents folder.")
+    parser.add_argument("--documents", default=DOCUMENTS_DIR, help="Folder of PDF/DOCX/TXT files.")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="Parser processes (1 = in-process).")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Chunks per embedding call.")
+    parser.add_argument("--dedup", default=DEDUP_MODE, choices=["off", "exact", "near"], help="Chunk de-duplication.")
+    parser.add_argument("--no-embedding-cache", action="store_true", help="Embed every chunk, ignoring the cache.")
+    args = parser.parse_args()
+
+    files = {}
+    for root, _, names in os.walk(args.documents):
+        for name in sorted(names):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                file_path = os.path.join(root, name)
+                files[os.path.relpath(file_path, args.documents).replace(os.sep, "/")] = file_path
+    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    if not args.no_embedding_cache:
+        embeddings = CachedEmbeddings(embeddings, EmbeddingCache(EMBEDDING_CACHE_PATH), EMBEDDING_MODEL)
+    _, _, stats = ingest_files(
+        files, None, embeddings, CHUNK_SIZE, CHUNK_OVERLAP, workers=args.workers, batch_size=args.batch_size,
+        dedup=ChunkDeduplicator(mode=args.dedup, max_distance=DEDUP_MAX_DISTANCE)
+    )
+    print(format_throughput(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# type: ignore
+"""Record and replay of Groq and Serper responses for offline, deterministic runs.
+
+REPLAY_MODE=record passes every LLM and Serper call through to the live API and
+appends the response (and how long it took) to the JSON-lines cassette at
+CASSETTE_PATH. REPLAY_MODE=replay answers the same calls from the cassette
+without network or API keys, sleeping for the recorded latency scaled by
+REPLAY_LATENCY_SCALE, or for a fixed REPLAY_LATENCY_MS when that is set. A call
+missing from the cassette raises CassetteMiss. Requests are keyed by their
+content (model settings and messages, or the Serper query); API keys are
+never written.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from agent.config.settings import REPLAY_MODE, CASSETTE_PATH, REPLAY_LATENCY_SCALE, REPLAY_LATENCY_MS
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+class Cassette:
+    """Recorded responses keyed by request hash, backed by an append-only JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.entries[entry["key"]] = entry
+
+    @staticmethod
+    def key(kind: str, request) -> str:
+        blob = json.dumps({"kind": kind, "request": request}, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, request):
+        entry = self.entries.get(self.key(kind, request))
+        if entry is None:
+            raise CassetteMiss(f"No recorded {kind} response for this request in {self.path}")
+        return entry
+
+    def put(self, kind: str, request, response, latency_ms: float):
+        entry = {
+            "key": self.key(kind, request),
+            "kind": kind,
+            "request": request,
+            "response": response,
+            "latency_ms": round(latency_ms, 3),
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            self.entries[entry["key"]] = entry
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    global _cassette
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(CASSETTE_PATH)
+    return _cassette
+
+
+def simulated_delay(recorded_ms: float) -> float:
+    """Seconds to wait when replaying a response that originally took recorded_ms."""
+    if REPLAY_LATENCY_MS is not None:
+        return REPLAY_LATENCY_MS / 1000
+    return recorded_ms * REPLAY_LATENCY_SCALE / 1000
+
+
+def replay_call(kind: str, request, fetch):
+    """Return fetch() live, recorded, or replayed from the cassette depending on REPLAY_MODE.
+
+    fetch must return a JSON-serializable response.
+    """
+    if REPLAY_MODE == "replay":
+        entry = get_cassette().get(kind, request)
+        time.sleep(simulated_delay(entry["latency_ms"]))
+        return entry["response"]
+    if REPLAY_MODE != "record":
+        return fetch()
+    start = time.perf_counter()
+    response = fetch()
+    get_cassette().put(kind, request, response, (time.perf_counter() - start) * 1000)
+    return response
+
+
+async def areplay_call(kind: str, request, afetch):
+    """Async variant of replay_call; afetch is a coroutine function."""
+    if REPLAY_MODE == "replay":
+        entry = get_cassette().get(kind, request)
+        await asyncio.sleep(simulated_delay(entry["latency_ms"]))
+        return entry["response"]
+    if REPLAY_MODE != "record":
+        return await afetch()
+    start = time.perf_counter()
+    response = await afetch()
+    get_cassette().put(kind, request, response, (time.perf_counter() - start) * 1000)
+    return response
+
+
+def _message_to_response(message) -> dict:
+    return {
+        "content": message.content,
+        "response_metadata": dict(getattr(message, "response_metadata", None) or {}),
+    }
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that records the replies of `inner` or replays them from the cassette.
+
+    In replay mode no inner model is needed, so no Groq key is required.
+    """
+
+    model_name: str
+    temperature: float = 0
+    max_tokens: int = 1024
+    inner: Optional[Any] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _request(self, messages, stop) -> dict:
+        return {
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stop": stop,
+            "messages": [{"role": message.type, "content": message.content} for message in messages],
+        }
+
+    @staticmethod
+    def _result(response: dict) -> ChatResult:
+        metadata = response.get("response_metadata", {})
+        message = AIMessage(content=response["content"], response_metadata=metadata)
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={"token_usage": metadata.get("token_usage", {}), "model_name": metadata.get("model_name")},
+        )
+
+    def _generate(self, messages: List, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        def fetch():
+            return _message_to_response(self.inner.invoke(messages, stop=stop, **kwargs))
+
+        return self._result(replay_call("llm", self._request(messages, stop), fetch))
+
+    async def _agenerate(self, messages: List, stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs) -> ChatResult:
+        async def afetch():
+            return _message_to_response(await self.inner.ainvoke(messages, stop=stop, **kwargs))
+
+        return self._result(await areplay_call("llm", self._request(messages, stop), afetch))
@@ -0,0 +1,168 @@
+# type: ignore
+import json
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from agent.config.settings import ROUTER_ENABLED, ROUTER_CONFIDENCE, ROUTER_SEED_PATH, ROUTER_TEMPERATURE
+
+# Decisions the pre-router may take on its own; DIRECT and CHAIN always go to the LLM.
+LOCAL_ROUTES = ("CALCULATOR", "MATH_SOLVER", "DOCUMENT_QA", "WEB_SEARCH")
+
+MATH_WORDS = (
+    "what is|what's|calculate|compute|evaluate|solve|find|please|the|of|and|add|subtract|multiply|divide|"
+    "plus|minus|times|multiplied|divided|by|percent|sqrt|square|cube|root|log|ln|sin|cos|tan|degrees|pi"
+)
+FILLER_RE = re.compile(rf"\b(?:{MATH_WORDS})\b")
+EXPRESSION_RE = re.compile(r"^[\d\s.+\-*/^%(),=]+$")
+OPERATOR_RE = re.compile(r"[+\-*/^%]|\b(?:plus|minus|times|divided|multiplied|percent|sqrt|root|log|ln|sin|cos|tan|add|subtract)\b")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+TIME_RE = re.compile(r"\b(?:today|tonight|tomorrow|yesterday|latest|current|currently|now|live|recent|news|headlines|weather|forecast|price|stock|score|this week|upcoming|20(?:2[4-9]|[3-9]\d))\b")
+PRIVATE_RE = re.compile(r"\b(?:my|uploaded|document|documents|pdf|file|files|handbook|prospectus|profile|resume|company|private|confidential|knowledge base|notes)\b")
+STORY_RE = re.compile(r"\b(?:how many|how much|how far|how long|how old|each|per|left|remain|if|has|have|buys|sells|travels|costs|earns)\b")
+TOKEN_RE = re.compile(r"[a-z]+|\d+(?:\.\d+)?|[+\-*/^%()]")
+
+# How routing decisions were made: "local" (pre-router), "cache" (route cache)
+# and "llm" (controller LLM calls); the controller reports the last two
+router_stats = {"local": 0, "cache": 0, "llm": 0, "routes": Counter()}
+_model = None
+_model_lock = threading.Lock()
+
+
+def is_expression(query: str) -> bool:
+    """True for bare arithmetic like '2+2', 'sqrt(16)' or 'what is 15% of 80'."""
+    text = query.lower().strip().rstrip("?.!")
+    if not NUMBER_RE.search(text) or not OPERATOR_RE.search(text):
+        return False
+    return bool(EXPRESSION_RE.match(FILLER_RE.sub(" ", text)))
+
+
+def has_math(query: str) -> bool:
+    """True if query has at least two numbers, or a number and an operator; a word problem needs one or the other."""
+    text = query.lower()
+    numbers = len(NUMBER_RE.findall(text))
+    return numbers >= 2 or (numbers == 1 and bool(OPERATOR_RE.search(text)))
+
+
+def extract_features(query: str):
+    """Word/number tokens plus the regex signals the controller prompt describes."""
+    text = query.lower()
+    features = ["<num>" if token[0].isdigit() else token for token in TOKEN_RE.findall(text)]
+    if is_expression(query):
+        features.append("<expression>")
+    if len(NUMBER_RE.findall(text)) >= 2:
+        features.append("<numbers>")
+    if TIME_RE.search(text):
+        features.append("<time>")
+    if PRIVATE_RE.search(text):
+        features.append("<private>")
+    if STORY_RE.search(text):
+        features.append("<story>")
+    return features
+
+
+class NaiveBayesRouter:
+    """Multinomial naive Bayes over extract_features, small enough to train at import.
+
+    Naive Bayes treats correlated features ("how", "many", <story>) as
+    independent evidence and is far too confident, so predict_proba divides
+    the log scores by temperature before normalizing.
+    """
+
+    def __init__(self, alpha: float = 1.0, temperature: float = ROUTER_TEMPERATURE):
+        self.alpha = alpha
+        self.temperature = temperature
+        self.label_counts = Counter()
+        self.feature_counts = defaultdict(Counter)
+        self.vocabulary = set()
+
+    def fit(self, examples):
+        for query, label in examples:
+            features = extract_features(query)
+            self.label_counts[label] += 1
+            self.feature_counts[label].update(features)
+            self.vocabulary.update(features)
+        return self
+
+    def predict_proba(self, query: str) -> dict:
+        features = extract_features(query)
+        total = sum(self.label_counts.values())
+        vocab_size = len(self.vocabulary) + 1
+        scores = {}
+        for label, count in self.label_counts.items():
+            label_total = sum(self.feature_counts[label].values())
+            score = math.log(count / total)
+            for feature in features:
+                score += math.log((self.feature_counts[label][feature] + self.alpha) / (label_total + self.alpha * vocab_size))
+            scores[label] = score
+        best = max(scores.values())
+        exp_scores = {label: math.exp((score - best) / self.temperature) for label, score in scores.items()}
+        norm = sum(exp_scores.values())
+        return {label: value / norm for label, value in exp_scores.items()}
+
+
+def load_seed_examples(path: str = ROUTER_SEED_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return [(item["query"], item["decision"]) for item in json.load(f)]
+
+
+def get_model():
+    """Return the naive Bayes router, training it from ROUTER_SEED_PATH on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = NaiveBayesRouter().fit(load_seed_examples())
+    return _model
+
+
+def classify(query: str):
+    """Return (decision, confidence) from the local rules and model.
+
+    MATH_SOLVER needs has_math to agree: "how many continents are there" reads
+    like a word problem to the model but has nothing to compute.
+    """
+    if is_expression(query):
+        return "CALCULATOR", 1.0
+    probabilities = get_model().predict_proba(query)
+    decision = max(probabilities, key=probabilities.get)
+    if decision == "MATH_SOLVER" and not has_math(query):
+        return decision, 0.0
+    return decision, probabilities[decision]
+
+
+def pre_route(query: str):
+    """Return a tool decision when the local classifier is confident, else None.
+
+    Local decisions are counted in router_stats; after a None result the
+    caller answers from its route cache or the controller LLM and counts that
+    with count_route.
+    """
+    if ROUTER_ENABLED:
+        try:
+            decision, confidence = classify(query)
+        except Exception as e:
+            print(f"Pre-router error, falling back to LLM: {e}")
+            decision, confidence = None, 0.0
+        if decision in LOCAL_ROUTES and confidence >= ROUTER_CONFIDENCE:
+            router_stats["local"] += 1
+            router_stats["routes"][decision] += 1
+            return decision
+    return None
+
+
+def count_route(method: str):
+    """Count a routing decision the pre-router left to the caller ("cache" or "llm")."""
+    router_stats[method] += 1
+
+
+def get_router_stats() -> dict:
+    """Counts of local, cached and LLM routing decisions and the share of LLM calls avoided."""
+    total = router_stats["local"] + router_stats["cache"] + router_stats["llm"]
+    return {
+        "local": router_stats["local"],
+        "cache": router_stats["cache"],
+        "llm": router_stats["llm"],
+        "routes": dict(router_stats["routes"]),
+        "llm_avoided_rate": (router_stats["local"] + router_stats["cache"]) / total if total else 0.0,
+    }
@@ -1,9 +1,11 @@
 # type: ignore
+import asyncio
 import math
 import sympy
 import re
 from langchain.tools import tool
 from sympy import pi
+from agent.tracing import span
 
 @tool
 def calculator(expression: str) -> str:
@@ -77,8 +79,14 @@ def calculator(expression: str) -> str:
         # Remove $ signs
         expr = expr.replace('$', '')
         # Evaluate using sympy for safety and flexibility
-        result = sympy.sympify(expr).evalf()
+        with span("sympy_eval", expression=expr):
+            result = sympy.sympify(expr).evalf()
         return str(result)
     except Exception as e:
         return f"Calculator Error: {str(e)}"
 
+async def acalculator(expression: str) -> str:
+    """Async calculator; sympy evaluation runs in a worker thread so the event loop stays free."""
+    return await asyncio.to_thread(calculator.func, expression)
+
+calculator.coroutine = acalculator
@@ -4,73 +4,222 @@ import types
 if sys.platform == "win32":
     sys.modules["pwd"] = types.SimpleNamespace(getpwuid=lambda x: None)
 from langchain.tools import tool
-from langchain_community.document_loaders.pdf import PyPDFLoader
-from langchain_community.document_loaders.text import TextLoader
-from langchain_community.document_loaders.word_document import Docx2txtLoader
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chains import RetrievalQA
-from langchain_groq import ChatGroq
-from agent.config.settings import GROQ_API_KEY, DOCUMENTS_DIR
+from agent.clients import get_llm, DEFAULT_MODEL
+from agent.tracing import span, token_usage_handler
+from agent.config.settings import (
+    DOCUMENTS_DIR, INDEX_DIR, INDEX_MMAP, INDEX_TYPE, INDEX_PARAMS, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, INGEST_WORKERS, EMBED_BATCH_SIZE,
+    DEDUP_MODE, DEDUP_MAX_DISTANCE, EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH, RETRIEVAL_MODE, HYBRID_FETCH_K, RRF_K
+)
+from agent.rag.index_store import settings_match, load_manifest, save_vector_store, load_vector_store, index_generation
+from agent.rag.indexer import sync_index
+from agent.rag.ingest import format_throughput
+from agent.rag.embedding_cache import EmbeddingCache, CachedEmbeddings
+from agent.rag.index_types import set_search_params
+from agent.rag.hybrid import HybridRetriever
 import os
 import shutil
+import asyncio
+import threading
+import time
 
 vector_store = None
 embeddings = None
+manifest = None
+loaded_generation = None  # index_generation() of the index last loaded or saved here
+qa_chain = None
+_qa_chain_store = None
+_index_lock = threading.Lock()
+_qa_chain_lock = threading.Lock()
+_embeddings_lock = threading.Lock()
 
-def load_documents_from_dir(documents_dir: str):
-    """Load supported documents dynamically from a folder."""
-    documents = []
-    for root, _, files in os.walk(documents_dir):
-        for file in files:
-            file_path = os.path.join(root, file)
-            ext = file.lower()
+# Background warm-up: status is "idle", "warming", "ready" or "error"
+warmup_state = {"status": "idle", "error": None, "seconds": None}
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+WARMING_UP_MESSAGE = "Document QA Error: the document index is still loading, please try again in a moment."
+
+def get_embeddings():
+    """Return the shared sentence-transformers embedding model, loading it once.
+
+    With EMBEDDING_CACHE_ENABLED, chunk embeddings go through the persistent
+    embedding cache so only text it has never seen is embedded.
+    """
+    global embeddings
+    if embeddings is None:
+        with _embeddings_lock:
+            if embeddings is None:
+                model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+                if EMBEDDING_CACHE_ENABLED:
+                    try:
+                        model = CachedEmbeddings(model, EmbeddingCache(EMBEDDING_CACHE_PATH), EMBEDDING_MODEL)
+                    except Exception as e:
+                        print(f"Embedding cache unavailable at {EMBEDDING_CACHE_PATH}: {e}")
+                embeddings = model
+    return embeddings
+
+def _sync_locked():
+    """Load the persisted index if needed and apply pending document changes to it.
+
+    The persisted index is loaded again when another process has saved it
+    since (index_generation). sync_index works on a copy, so queries that
+    already hold the old store finish on it; the updated store only replaces
+    the global reference here.
+    """
+    global vector_store, manifest, loaded_generation
+    generation = index_generation(INDEX_DIR)
+    if vector_store is None or generation != loaded_generation:
+        saved_manifest = load_manifest(INDEX_DIR)
+        if vector_store is None:
+            manifest = saved_manifest
+        if settings_match(saved_manifest, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP):
             try:
-                if ext.endswith(".pdf"):
-                    docs = PyPDFLoader(file_path).load()
-                elif ext.endswith(".docx"):
-                    docs = Docx2txtLoader(file_path).load()
-                elif ext.endswith(".txt"):
-                    docs = TextLoader(file_path).load()
-                else:
-                    continue
-                documents.extend(docs)
+                store = load_vector_store(INDEX_DIR, get_embeddings(), mmap=INDEX_MMAP)
+                set_search_params(store.index, INDEX_PARAMS)
+                vector_store, manifest = store, saved_manifest
             except Exception as e:
-                print(f"Error loading {file_path}: {e}")
-    return documents
+                print(f"Error loading index from {INDEX_DIR}, rebuilding: {e}")
+        loaded_generation = generation
+    vector_store, new_manifest, stats = sync_index(
+        vector_store, manifest, DOCUMENTS_DIR, get_embeddings(), EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP,
+        workers=INGEST_WORKERS, batch_size=EMBED_BATCH_SIZE, dedup_mode=DEDUP_MODE, max_distance=DEDUP_MAX_DISTANCE,
+        index_type=INDEX_TYPE, index_params=INDEX_PARAMS
+    )
+    if "ingest" in stats:
+        print(f"Indexed {format_throughput(stats['ingest'])}")
+    changed = (
+        stats["added"] or stats["modified"] or stats["deleted"] or stats.get("index_rebuilt") or stats.get("bm25_built")
+        or new_manifest["files"] != (manifest or {}).get("files")
+    )
+    manifest = new_manifest
+    if changed and vector_store is not None:
+        try:
+            save_vector_store(vector_store, INDEX_DIR, manifest)
+            loaded_generation = index_generation(INDEX_DIR)
+        except Exception as e:
+            print(f"Error saving index to {INDEX_DIR}: {e}")
+    return stats
 
 def initialize_document_qa():
-    """Initialize the document QA system."""
-    global vector_store, embeddings
-    if vector_store is not None:
+    """Initialize the document QA system.
+
+    Loads the persisted index from INDEX_DIR and embeds only documents that were
+    added or changed since it was saved. An index another process has saved
+    since it was loaded here is loaded again.
+    """
+    if vector_store is not None and index_generation(INDEX_DIR) == loaded_generation:
         return vector_store
     if not os.path.exists(DOCUMENTS_DIR):
         os.makedirs(DOCUMENTS_DIR)
         return None
-    documents = load_documents_from_dir(DOCUMENTS_DIR)
-    if not documents:
-        return None
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    texts = text_splitter.split_documents(documents)
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vector_store = FAISS.from_documents(texts, embeddings)
+    with _index_lock:
+        if vector_store is None or index_generation(INDEX_DIR) != loaded_generation:
+            _sync_locked()
     return vector_store
 
+def refresh_document_qa():
+    """Re-index DOCUMENTS_DIR incrementally after files were added, changed or removed."""
+    os.makedirs(DOCUMENTS_DIR, exist_ok=True)
+    with _index_lock:
+        return _sync_locked()
+
+def _warmup():
+    start = time.perf_counter()
+    try:
+        # One embedding call also loads the tokenizer and model weights into memory
+        get_embeddings().embed_query("warm-up")
+        initialize_document_qa()
+        warmup_state.update(status="ready", error=None)
+    except Exception as e:
+        print(f"Document QA warm-up failed: {e}")
+        warmup_state.update(status="error", error=str(e))
+    warmup_state["seconds"] = time.perf_counter() - start
+
+def start_warmup():
+    """Load the embedding model and vector index in a daemon thread, once per process.
+
+    Returns immediately; poll get_warmup_status() for readiness. While the
+    warm-up runs, document_qa answers with WARMING_UP_MESSAGE instead of
+    waiting for it.
+    """
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            warmup_state["status"] = "warming"
+            _warmup_thread = threading.Thread(target=_warmup, name="document-qa-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+def is_warming_up() -> bool:
+    return warmup_state["status"] == "warming"
+
+def get_warmup_status() -> dict:
+    return dict(warmup_state)
+
+def get_qa_chain(store):
+    """Return the RetrievalQA chain over store, building it only when the store changes.
+
+    The chain holds no per-query state, so a single instance is shared by all
+    callers and threads; only a rebuilt vector store replaces it.
+    """
+    global qa_chain, _qa_chain_store
+    if qa_chain is not None and _qa_chain_store is store:
+        return qa_chain
+    with _qa_chain_lock:
+        if qa_chain is None or _qa_chain_store is not store:
+            if RETRIEVAL_MODE == "hybrid":
+                retriever = HybridRetriever(vector_store=store, k=3, fetch_k=HYBRID_FETCH_K, rrf_k=RRF_K)
+            else:
+                retriever = store.as_retriever(search_kwargs={"k": 3})
+            qa_chain = RetrievalQA.from_chain_type(
+                llm=get_llm(),
+                chain_type="stuff",
+                retriever=retriever,
+                return_source_documents=False
+            )
+            _qa_chain_store = store
+    return qa_chain
+
 @tool
 def document_qa(question: str) -> str:
     """Answers questions based on documents in the local knowledge base using RAG."""
+    if is_warming_up():
+        return WARMING_UP_MESSAGE
     try:
         vector_store = initialize_document_qa()
-        if vector_store is None:
+        if vector_store is None or vector_store.index.ntotal == 0:
             return "No documents found in data/documents/. Please add files."
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=ChatGroq(api_key=GROQ_API_KEY, model="llama3-8b-8192", temperature=0),
-            chain_type="stuff",
-            retriever=vector_store.as_retriever(search_kwargs={"k": 3}),
-            return_source_documents=False
-        )
-        result = qa_chain({"query": question})
-        return result["result"]
+        qa_chain = get_qa_chain(vector_store)
+        with span("retrieval", k=3, mode=RETRIEVAL_MODE) as record:
+            docs = qa_chain.retriever.invoke(question)
+            record["attrs"]["documents"] = len(docs)
+        with span("generation", model=DEFAULT_MODEL) as record:
+            result = qa_chain.combine_documents_chain.invoke(
+                {"input_documents": docs, "question": question}, config={"callbacks": [token_usage_handler(record)]}
+            )
+        return result["output_text"]
     except Exception as e:
         return f"Document QA Error: {str(e)}"
+
+async def adocument_qa(question: str) -> str:
+    """Async variant of document_qa; index loading runs in a worker thread."""
+    if is_warming_up():
+        return WARMING_UP_MESSAGE
+    try:
+        vector_store = await asyncio.to_thread(initialize_document_qa)
+        if vector_store is None or vector_store.index.ntotal == 0:
+            return "No documents found in data/documents/. Please add files."
+        qa_chain = get_qa_chain(vector_store)
+        with span("retrieval", k=3, mode=RETRIEVAL_MODE) as record:
+            docs = await qa_chain.retriever.ainvoke(question)
+            record["attrs"]["documents"] = len(docs)
+        with span("generation", model=DEFAULT_MODEL) as record:
+            result = await qa_chain.combine_documents_chain.ainvoke(
+                {"input_documents": docs, "question": question}, config={"callbacks": [token_usage_handler(record)]}
+            )
+        return result["output_text"]
+    except Exception as e:
+        return f"Document QA Error: {str(e)}"
+
+document_qa.coroutine = adocument_qa
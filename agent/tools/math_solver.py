@@ -1,27 +1,85 @@
 # type: ignore
 import os
 from langchain.tools import tool
-from langchain_groq import ChatGroq
 from dotenv import load_dotenv
+from agent.clients import get_llm
+from agent.tracing import span, record_llm_usage
+from agent.config.settings import REPLAY_MODE
 
 load_dotenv()
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 
+def _build_prompt(problem: str) -> str:
+    return f"""Solve the following math problem step by step. Show your reasoning and provide the final answer. Problem: {problem}
+        Format the final answer as: \\boxed{{answer}}"""
+
 @tool
 def math_solver(problem: str) -> str:
     """Solves complex math word problems using step-by-step reasoning. Specialized for GSM8k-style problems."""
     try:
-        if not GROQ_API_KEY:
+        if not GROQ_API_KEY and REPLAY_MODE != "replay":
             return "Math Solver Error: API key not set."
-        math_llm = ChatGroq(
-            api_key=GROQ_API_KEY,
+        math_llm = get_llm(
             model="llama3-70b-8192",
             temperature=0,
             max_tokens=1024,
         )
-        prompt = f"""Solve the following math problem step by step. Show your reasoning and provide the final answer. Problem: {problem}
-        Format the final answer as: \\boxed{{answer}}"""
-        response = math_llm.invoke(prompt)
+        with span("generation", model="llama3-70b-8192") as record:
+            response = math_llm.invoke(_build_prompt(problem))
+            record_llm_usage(record, response)
+        return f"➗ Math Solution (via Llama3-70B):\n\n{response.content}"
+    except Exception as e:
+        return f"Math Solver Error: {str(e)}"
+
+async def amath_solver(problem: str) -> str:
+    """Async variant of math_solver using the shared Llama3-70B client."""
+    try:
+        if not GROQ_API_KEY and REPLAY_MODE != "replay":
+            return "Math Solver Error: API key not set."
+        math_llm = get_llm(
+            model="llama3-70b-8192",
+            temperature=0,
+            max_tokens=1024,
+        )
+        with span("generation", model="llama3-70b-8192") as record:
+            response = await math_llm.ainvoke(_build_prompt(problem))
+            record_llm_usage(record, response)
         return f"➗ Math Solution (via Llama3-70B):\n\n{response.content}"
     except Exception as e:
         return f"Math Solver Error: {str(e)}"
+
+async def astream_math_solver(problem: str):
+    """Yield math_solver's answer in chunks as Llama3-70B generates it; the joined
+    chunks equal amath_solver's result.
+
+    An error before the first chunk is yielded as a "Math Solver Error: ..." string
+    like the other variants; one after it is raised, since part of the answer is
+    already out.
+    """
+    started = False
+    try:
+        if not GROQ_API_KEY and REPLAY_MODE != "replay":
+            yield "Math Solver Error: API key not set."
+            return
+        math_llm = get_llm(
+            model="llama3-70b-8192",
+            temperature=0,
+            max_tokens=1024,
+        )
+        with span("generation", model="llama3-70b-8192") as record:
+            message = None
+            async for chunk in math_llm.astream(_build_prompt(problem)):
+                message = chunk if message is None else message + chunk
+                if chunk.content:
+                    if not started:
+                        started = True
+                        yield "➗ Math Solution (via Llama3-70B):\n\n"
+                    yield chunk.content
+            if message is not None:
+                record_llm_usage(record, message)
+    except Exception as e:
+        if started:
+            raise
+        yield f"Math Solver Error: {str(e)}"
+
+math_solver.coroutine = amath_solver
@@ -1,29 +1,61 @@
 # type: ignore
 import os
-import requests
 from langchain.tools import tool
 import json
 from dotenv import load_dotenv
+from agent.clients import get_http_session, get_async_http_client
+from agent.tracing import span
+from agent.replay import replay_call, areplay_call
+from agent.config.settings import REPLAY_MODE
 
 load_dotenv()
 SERPER_API_KEY = os.environ.get("SERPER_API_KEY")
+SERPER_URL = "https://google.serper.dev/search"
+
+def _format_results(data: dict) -> str:
+    result_text = "🔍 Web Results:\n"
+    if 'organic' in data and data['organic']:
+        for i, res in enumerate(data['organic'][:3], 1):
+            result_text += f"{i}. {res.get('title', 'No title')}\n   {res.get('link', 'No link')}\n   {res.get('snippet', 'No snippet')}\n\n"
+    return result_text or "No relevant results found."
 
 @tool
 def web_search(query: str) -> str:
     """Web search using Serper API."""
     try:
-        if not SERPER_API_KEY:
+        if not SERPER_API_KEY and REPLAY_MODE != "replay":
+            return "WebSearch Error: API key not set."
+        payload = json.dumps({"q": query.strip()[:100]})
+        headers = {'X-API-KEY': SERPER_API_KEY, 'Content-Type': 'application/json'}
+
+        def fetch():
+            response = get_http_session().post(SERPER_URL, headers=headers, data=payload, timeout=10)
+            response.raise_for_status()
+            return response.json()
+
+        with span("web_fetch", provider="serper"):
+            data = replay_call("serper", {"url": SERPER_URL, "body": payload}, fetch)
+        return _format_results(data)
+    except Exception as e:
+        return f"WebSearch Error: {str(e)}"
+
+async def aweb_search(query: str) -> str:
+    """Async web search using Serper API."""
+    try:
+        if not SERPER_API_KEY and REPLAY_MODE != "replay":
             return "WebSearch Error: API key not set."
-        url = "https://google.serper.dev/search"
         payload = json.dumps({"q": query.strip()[:100]})
         headers = {'X-API-KEY': SERPER_API_KEY, 'Content-Type': 'application/json'}
-        response = requests.post(url, headers=headers, data=payload, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        result_text = "🔍 Web Results:\n"
-        if 'organic' in data and data['organic']:
-            for i, res in enumerate(data['organic'][:3], 1):
-                result_text += f"{i}. {res.get('title', 'No title')}\n   {res.get('link', 'No link')}\n   {res.get('snippet', 'No snippet')}\n\n"
-        return result_text or "No relevant results found."
+
+        async def afetch():
+            response = await get_async_http_client().post(SERPER_URL, headers=headers, content=payload, timeout=10)
+            response.raise_for_status()
+            return response.json()
+
+        with span("web_fetch", provider="serper"):
+            data = await areplay_call("serper", {"url": SERPER_URL, "body": payload}, afetch)
+        return _format_results(data)
     except Exception as e:
-        return f"WebSearch Error: {str(e)}"
\ No newline at end of file
+        return f"WebSearch Error: {str(e)}"
+
+web_search.coroutine = aweb_search
\ No newline at end of file
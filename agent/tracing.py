@@ -0,0 +1,265 @@
+# type: ignore
+"""Per-request timing spans and token counts for ask_agent.
+
+Every aask_agent call runs inside trace_request(); pipeline stages open span()s
+(routing, retrieval, generation, web_fetch, sympy_eval, ...) and LLM responses
+add their prompt/completion token counts. Finished traces are passed to the
+hooks registered with add_trace_hook() and appended to TRACE_PATH as JSON lines
+(size-capped and rotated, with the query text and attrs derived from it hashed
+or redacted per TRACE_QUERY_MODE);
+`python -m agent.tracing --chrome out.json` converts that file for
+chrome://tracing or Perfetto.
+"""
+import argparse
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from agent.config.settings import (
+    TRACE_ENABLED, TRACE_PATH, TRACE_MAX_BYTES, TRACE_BACKUPS, TRACE_QUERY_MODE
+)
+
+_current_trace = contextvars.ContextVar("agent_trace", default=None)
+_current_span = contextvars.ContextVar("agent_span", default=None)
+_hooks = []
+_write_lock = threading.Lock()
+_token_usage_handler_class = None
+# Trace and span attrs that can hold query text, stored per TRACE_QUERY_MODE
+QUERY_TEXT_ATTRS = ("query", "expression", "tool_order", "error")
+
+
+def add_trace_hook(hook):
+    """Call hook(trace_dict) after every finished request."""
+    _hooks.append(hook)
+
+
+def remove_trace_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextlib.contextmanager
+def trace_request(name: str, **attrs):
+    """Collect the spans of one request; yields the trace dict so callers can add attrs."""
+    trace = {
+        "trace_id": uuid.uuid4().hex,
+        "name": name,
+        "start": time.time(),
+        "duration_ms": 0.0,
+        "attrs": dict(attrs),
+        "spans": [],
+        "llm_calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+    }
+    start = time.perf_counter()
+    trace["_perf_start"] = start
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        trace["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        del trace["_perf_start"]
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _finish(trace)
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs):
+    """Time one pipeline stage of the current request; a no-op outside trace_request."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield {"name": name, "attrs": dict(attrs)}
+        return
+    parent = _current_span.get()
+    record = {
+        "id": uuid.uuid4().hex[:16],
+        "parent": parent["id"] if parent else None,
+        "name": name,
+        "start_ms": round((time.perf_counter() - trace["_perf_start"]) * 1000, 3),
+        "duration_ms": 0.0,
+        "attrs": dict(attrs),
+    }
+    trace["spans"].append(record)
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["attrs"]["error"] = str(e)
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        _current_span.reset(token)
+
+
+def _usage_from_message(message) -> tuple:
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage", {})
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+def add_token_usage(record, prompt_tokens: int, completion_tokens: int, trace=None):
+    """Add one LLM call's token counts to a span record and its trace."""
+    trace = trace or _current_trace.get()
+    attrs = record["attrs"]
+    attrs["llm_calls"] = attrs.get("llm_calls", 0) + 1
+    attrs["prompt_tokens"] = attrs.get("prompt_tokens", 0) + prompt_tokens
+    attrs["completion_tokens"] = attrs.get("completion_tokens", 0) + completion_tokens
+    if trace is not None:
+        trace["llm_calls"] += 1
+        trace["prompt_tokens"] += prompt_tokens
+        trace["completion_tokens"] += completion_tokens
+
+
+def record_llm_usage(record, message):
+    """Record the token usage reported on an LLM response message."""
+    add_token_usage(record, *_usage_from_message(message))
+
+
+def _define_token_usage_handler():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenUsageHandler(BaseCallbackHandler):
+        """LangChain callback that records token usage of every LLM call inside a chain to a span."""
+
+        def __init__(self, record):
+            self.record = record
+            self.trace = _current_trace.get()
+
+        def on_llm_end(self, response, **kwargs):
+            for generations in response.generations:
+                for generation in generations:
+                    message = getattr(generation, "message", None)
+                    if message is not None:
+                        add_token_usage(self.record, *_usage_from_message(message), trace=self.trace)
+                        return
+            token_usage = (response.llm_output or {}).get("token_usage", {})
+            add_token_usage(
+                self.record, token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0),
+                trace=self.trace
+            )
+
+    return TokenUsageHandler
+
+
+def token_usage_handler(record):
+    """Return a LangChain callback that adds the token usage of every LLM call in a chain to record.
+
+    The handler class is defined on first use, so importing agent.tracing does
+    not import langchain_core.
+    """
+    global _token_usage_handler_class
+    if _token_usage_handler_class is None:
+        _token_usage_handler_class = _define_token_usage_handler()
+    return _token_usage_handler_class(record)
+
+
+def _stored_query(query: str):
+    if TRACE_QUERY_MODE == "raw":
+        return query
+    if TRACE_QUERY_MODE == "hash":
+        return "sha256:" + hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+    return "[redacted]"
+
+
+def _rotate(path: str, incoming: int):
+    """Shift path to path.1 (path.1 to path.2, ...) if incoming bytes would take it past TRACE_MAX_BYTES."""
+    if not TRACE_MAX_BYTES or not os.path.exists(path) or os.path.getsize(path) + incoming <= TRACE_MAX_BYTES:
+        return
+    if TRACE_BACKUPS <= 0:
+        os.remove(path)
+        return
+    for number in range(TRACE_BACKUPS - 1, 0, -1):
+        if os.path.exists(f"{path}.{number}"):
+            os.replace(f"{path}.{number}", f"{path}.{number + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def trace_files(path: str = TRACE_PATH):
+    """The rotated backups of path that exist, oldest first, followed by path itself."""
+    backups = [f"{path}.{number}" for number in range(TRACE_BACKUPS, 0, -1)]
+    return [backup for backup in backups if os.path.exists(backup)] + [path]
+
+
+def _stored_attrs(attrs: dict) -> dict:
+    if TRACE_QUERY_MODE == "raw" or not any(key in attrs for key in QUERY_TEXT_ATTRS):
+        return attrs
+    return {key: _stored_query(str(value)) if key in QUERY_TEXT_ATTRS else value for key, value in attrs.items()}
+
+
+def stored_trace(trace: dict) -> dict:
+    """The trace as written to TRACE_PATH, with query-derived attrs hashed or redacted."""
+    return {
+        **trace,
+        "attrs": _stored_attrs(trace["attrs"]),
+        "spans": [{**record, "attrs": _stored_attrs(record["attrs"])} for record in trace["spans"]],
+    }
+
+
+def _finish(trace):
+    for hook in list(_hooks):
+        try:
+            hook(trace)
+        except Exception as e:
+            print(f"Trace hook {hook!r} failed: {e}")
+    if TRACE_ENABLED and TRACE_PATH:
+        try:
+            line = json.dumps(stored_trace(trace), ensure_ascii=False, default=str)
+            with _write_lock:
+                os.makedirs(os.path.dirname(TRACE_PATH), exist_ok=True)
+                _rotate(TRACE_PATH, len(line.encode("utf-8")) + 1)
+                with open(TRACE_PATH, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except Exception as e:
+            print(f"Error writing trace to {TRACE_PATH}: {e}")
+
+
+def read_traces(path: str = TRACE_PATH):
+    """Yield the traces recorded in a JSON-lines trace file."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def to_chrome_trace(traces) -> dict:
+    """Convert traces to the Chrome trace event format (complete "X" events, microseconds)."""
+    events = []
+    for index, trace in enumerate(traces):
+        base_us = trace["start"] * 1e6
+        attrs = {**trace["attrs"], "llm_calls": trace["llm_calls"], "prompt_tokens": trace["prompt_tokens"],
+                 "completion_tokens": trace["completion_tokens"]}
+        events.append({"name": trace["name"], "cat": "request", "ph": "X", "ts": base_us,
+                       "dur": trace["duration_ms"] * 1000, "pid": 1, "tid": index, "args": attrs})
+        for record in trace["spans"]:
+            events.append({"name": record["name"], "cat": "stage", "ph": "X",
+                           "ts": base_us + record["start_ms"] * 1000, "dur": record["duration_ms"] * 1000,
+                           "pid": 1, "tid": index, "args": record["attrs"]})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export recorded ask_agent traces.")
+    parser.add_argument("--input", default=TRACE_PATH, help="JSON-lines trace file.")
+    parser.add_argument("--chrome", required=True, help="Output path for a Chrome trace JSON file.")
+    args = parser.parse_args()
+    with open(args.chrome, "w", encoding="utf-8") as f:
+        json.dump(to_chrome_trace(read_traces(args.input)), f)
+    print(f"Wrote {args.chrome}")
@@ -5,12 +5,13 @@ import os
 import shutil
 import datetime
 import json
-import plotly.graph_objects as go
-import plotly.express as px
 from pathlib import Path
 from typing import Dict, Any, List
 import logging
-import pandas as pd
+import threading
+
+# plotly, pandas and the document_qa stack (FAISS, sentence-transformers) are
+# imported inside the functions that use them, so the app starts without them
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,10 +31,12 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 try:
-    from agent.tools.document_qa import initialize_document_qa
-    from agent.controller import ask_agent
+    from agent.controller import stream_agent, semantic_cache, cache_backend
     from evaluation.evaluate_lama import evaluate_lama
     from evaluation.evaluate_gsm8k import evaluate_gsm8k
+    from evaluation.runner import parse_accuracy
+    from agent import metrics
+    from agent.config.settings import GROQ_API_KEY, SERPER_API_KEY, REPLAY_MODE, WARMUP_ENABLED
 except ModuleNotFoundError as e:
     raise ModuleNotFoundError(
         f"{e}. Ensure you're running from project root ({PROJECT_ROOT}), 'agent' and 'evaluation' are packages, "
@@ -50,6 +53,24 @@ if 'benchmark_results' not in st.session_state:
 if 'theme' not in st.session_state:
     st.session_state.theme = "Light"
 
+@st.cache_resource
+def start_background_warmup():
+    """Load the embedding model and document index once per server process, off the request path.
+
+    The document_qa import itself happens in the thread too, so the first page
+    renders without waiting for FAISS and sentence-transformers.
+    """
+    def warm_up():
+        from agent.tools.document_qa import start_warmup
+        start_warmup()
+
+    thread = threading.Thread(target=warm_up, name="document-qa-import", daemon=True)
+    thread.start()
+    return thread
+
+if WARMUP_ENABLED:
+    start_background_warmup()
+
 # Create answers folder for benchmark tracking
 answers_folder = Path("data/results/answers")
 answers_folder.mkdir(parents=True, exist_ok=True)
@@ -239,6 +260,14 @@ def setup_custom_css():
         background: linear-gradient(45deg, #EF4444, #DC2626);
     }
     
+    .tool-warming {
+        border-left: 4px solid #F59E0B;
+    }
+    
+    .status-warming {
+        background: linear-gradient(45deg, #F59E0B, #D97706);
+    }
+    
     /* Enhanced Buttons */
     .stButton button {
         background: linear-gradient(135deg, #3B82F6 0%, #1D4ED8 100%);
@@ -629,6 +658,14 @@ def setup_custom_css():
         background: linear-gradient(45deg, #EF4444, #DC2626);
     }
     
+    .tool-warming {
+        border-left: 4px solid #F59E0B;
+    }
+    
+    .status-warming {
+        background: linear-gradient(45deg, #F59E0B, #D97706);
+    }
+    
     /* Enhanced Buttons */
     .stButton button {
         background: linear-gradient(135deg, #3B82F6 0%, #1D4ED8 100%);
@@ -847,18 +884,27 @@ def setup_custom_css():
     else:
         st.markdown(dark_css, unsafe_allow_html=True)
 
-def chat_function(message):
-    """Enhanced chat function with better error handling."""
+def stream_chat_function(message, container):
+    """Stream the answer into container as it is generated, then add it to the history."""
     try:
-        response, source = ask_agent(message)
-        current_history = (message, response, source)
-        st.session_state.past_history.append(current_history)
-        return current_history
+        with container:
+            with st.chat_message("user"):
+                st.markdown(f"**You:** {message}")
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                placeholder.markdown("🤔 Thinking...")
+                stream = stream_agent(message)
+                text = ""
+                for chunk in stream:
+                    text += chunk
+                    placeholder.markdown(f"**Assistant:** {text}▌")
+                placeholder.markdown(f"**Assistant:** {text}")
+        current_history = (message, stream.response, stream.source)
     except Exception as e:
         logger.error(f"Chat function error: {str(e)}")
         current_history = (message, f"❌ Error: {str(e)}", "Error")
-        st.session_state.past_history.append(current_history)
-        return current_history
+    st.session_state.past_history.append(current_history)
+    return current_history
 
 def upload_files(files):
     """Enhanced file upload with better feedback."""
@@ -874,9 +920,16 @@ def upload_files(files):
                     f.write(file.getbuffer())
                 file_paths.append(dest_path)
 
-        # Reset vector store to force reload
-        initialize_document_qa()
-        return f"✅ Successfully uploaded {len(file_paths)} files and reloaded vector store."
+        # Embed only the new or changed files into the existing index
+        from agent.tools.document_qa import refresh_document_qa
+        stats = refresh_document_qa()
+        semantic_cache.clear(route="DOCUMENT_QA")
+        cache_backend.clear("tool:Document QA")
+        message = f"✅ Successfully uploaded {len(file_paths)} files and indexed {stats['chunks_added']} new chunks."
+        if "ingest" in stats:
+            ingest = stats["ingest"]
+            message += f" ({ingest['pages_per_sec']:.1f} pages/s, {ingest['chunks_per_sec']:.1f} chunks/s)"
+        return message
     except Exception as e:
         logger.error(f"File upload error: {str(e)}")
         return f"❌ Error uploading files: {str(e)}"
@@ -892,16 +945,37 @@ def get_tool_status():
     ]
     return tools_info
 
+def get_tool_readiness(tool_key: str):
+    """Return (state, status text) for a tool; state is "ready", "warming" or "disabled"."""
+    offline = REPLAY_MODE == "replay"
+    if tool_key == "web_search" and not (SERPER_API_KEY or offline):
+        return "disabled", "Disabled: SERPER_API_KEY not set"
+    if tool_key in ("math_solver", "general") and not (GROQ_API_KEY or offline):
+        return "disabled", "Disabled: GROQ_API_KEY not set"
+    if tool_key == "document_qa":
+        document_qa_module = sys.modules.get("agent.tools.document_qa")
+        if document_qa_module is None:
+            # Still importing in the warm-up thread, or loaded on first use when warm-up is off
+            return ("warming", "Warming up...") if WARMUP_ENABLED else ("ready", "Ready (loads on first use)")
+        status = document_qa_module.get_warmup_status()
+        if status["status"] == "warming":
+            return "warming", "Warming up..."
+        if status["status"] == "error":
+            return "disabled", f"Error: {status['error']}"
+        if status["status"] == "ready" and status["seconds"] is not None:
+            return "ready", f"Ready (warmed up in {status['seconds']:.1f}s)"
+    return "ready", "Ready"
+
+@st.fragment(run_every=5)
 def render_tool_status():
-    """Render enhanced tool status cards."""
+    """Render enhanced tool status cards, refreshed every few seconds while the sidebar is open."""
     st.markdown("### 🛠 Available Tools", help="Overview of AI tools and their status.")
     tools_info = get_tool_status()
     
     for tool_name, tool_key, description in tools_info:
-        is_ready = True  # Assume all tools are ready for simplicity
-        status_class = "tool-ready" if is_ready else "tool-disabled"
-        status_dot = "status-ready" if is_ready else "status-disabled"
-        status_text = "Ready" if is_ready else "Disabled"
+        state, status_text = get_tool_readiness(tool_key)
+        status_class = {"ready": "tool-ready", "warming": "tool-warming"}.get(state, "tool-disabled")
+        status_dot = {"ready": "status-ready", "warming": "status-warming"}.get(state, "status-disabled")
         
         st.markdown(f"""
         <div class='tool-card {status_class}'>
@@ -958,7 +1032,10 @@ def run_single_benchmark(benchmark_type: str, benchmark_func):
             else:  # gsm8k
                 result = evaluate_gsm8k()
             
-            accuracy = 75.0  # Placeholder - replace with actual accuracy extraction
+            accuracy = parse_accuracy(result)
+            if accuracy is None:
+                logger.error(f"No accuracy found in {benchmark_type} output")
+                return result
             
             st.session_state.benchmark_results[benchmark_type] = {
                 "accuracy": accuracy,
@@ -1000,6 +1077,7 @@ def display_performance_graph():
     if not st.session_state.benchmark_results:
         return
     
+    import plotly.graph_objects as go
     st.markdown("#### 📈 Performance Overview")
     benchmarks = list(st.session_state.benchmark_results.keys())
     accuracies = [st.session_state.benchmark_results[b]["accuracy"] for b in benchmarks]
@@ -1055,7 +1133,7 @@ def render_sidebar():
         """, unsafe_allow_html=True)
         
         page = st.radio("Select a page", 
-                       ["💬 Chat", "📊 Evaluation", "📁 Documents", "ℹ️ About"], 
+                       ["💬 Chat", "📊 Evaluation", "⚡ Performance", "📁 Documents", "ℹ️ About"], 
                        index=0, 
                        label_visibility="collapsed")
         
@@ -1179,9 +1257,8 @@ def render_chat_page():
         # Enhanced input area
         prompt = st.chat_input("💭 Ask me anything...", key="chat_input")
         if prompt:
-            with st.spinner("🤔 Thinking..."):
-                chat_function(prompt)
-                st.rerun()
+            stream_chat_function(prompt, chat_container)
+            st.rerun()
         
         # Action buttons
         st.markdown("### ⚡ Quick Actions")
@@ -1221,9 +1298,8 @@ def render_chat_page():
         
         for i, example in enumerate(examples):
             if st.button(example, key=f"example_{i}", use_container_width=True, help=f"Try: {example}"):
-                with st.spinner("🚀 Processing..."):
-                    chat_function(example.split(' ', 1)[1] if ' ' in example else example)
-                    st.rerun()
+                stream_chat_function(example.split(' ', 1)[1] if ' ' in example else example, chat_container)
+                st.rerun()
         
         st.markdown("</div>", unsafe_allow_html=True)
         
@@ -1287,6 +1363,108 @@ def render_evaluation_page():
                         height=200,
                         help="Detailed results from GSM8K benchmark")
 
+def latency_chart(rows, title: str):
+    """Grouped p50/p95/p99 bar chart from metrics latency rows."""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    names = [row["name"] for row in rows]
+    for q, color in zip(metrics.PERCENTILES, ['#10B981', '#F59E0B', '#EF4444']):
+        fig.add_trace(go.Bar(name=f"p{q}", x=names, y=[row[f"p{q}_ms"] for row in rows], marker_color=color))
+    fig.update_layout(
+        title=dict(text=title, font=dict(size=18, family='Inter'), x=0.5),
+        barmode='group',
+        yaxis=dict(title=dict(text="Latency (ms)", font=dict(size=14))),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        margin=dict(l=40, r=40, t=80, b=40)
+    )
+    return fig
+
+def render_performance_page():
+    """Latency, cache and throughput metrics from the recorded request traces."""
+    st.markdown("<h1 class='main-header'>⚡ Performance</h1>", unsafe_allow_html=True)
+    st.markdown("<p class='sub-header'>Latency, caching and throughput of recent agent requests! ⏱️</p>", unsafe_allow_html=True)
+    
+    windows = {"Last hour": 1, "Last 24 hours": 24, "Last 7 days": 24 * 7, "All time": None}
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        window = st.selectbox("Time window", list(windows), index=1)
+    with col2:
+        bucket_seconds = st.selectbox("Throughput bucket (s)", [10, 60, 300, 3600], index=1)
+    
+    traces = metrics.load_traces(since=metrics.window_start(windows[window]))
+    if not traces:
+        st.info("📭 No traces recorded yet. Ask the agent a few questions or run a benchmark.")
+        return
+    
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
+    # Headline numbers
+    summary = metrics.summarize(traces)
+    cards = [
+        ("📨 Requests", f"{summary['requests']}"),
+        ("⏱️ p50", f"{summary['p50_ms']:.0f} ms"),
+        ("⏱️ p95", f"{summary['p95_ms']:.0f} ms"),
+        ("⏱️ p99", f"{summary['p99_ms']:.0f} ms"),
+        ("🧠 LLM calls / query", f"{summary['llm_calls_per_query']:.2f}"),
+        ("🔤 Tokens / query", f"{summary['tokens_per_query']:.0f}"),
+    ]
+    for col, (label, value) in zip(st.columns(len(cards)), cards):
+        with col:
+            st.markdown(f"""
+            <div class='benchmark-card' style='margin: 10px 0;'>
+                <div style='font-size: 14px; margin-bottom: 5px;'>{label}</div>
+                <div style='font-size: 24px; font-weight: 800;'>{value}</div>
+            </div>
+            """, unsafe_allow_html=True)
+    
+    # Latency percentiles
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(latency_chart(metrics.latency_by_route(traces), "End-to-end latency per tool"), use_container_width=True)
+    with col2:
+        st.plotly_chart(latency_chart(metrics.latency_by_stage(traces), "Latency per stage"), use_container_width=True)
+    
+    # Caches and LLM calls
+    col1, col2 = st.columns(2)
+    with col1:
+        cache_df = pd.DataFrame(metrics.cache_hit_rates(traces))
+        cache_df["hit_rate"] = cache_df["hit_rate"] * 100
+        fig = px.bar(cache_df, x="cache", y="hit_rate", text=cache_df["hit_rate"].map(lambda v: f"{v:.1f}%"),
+                     hover_data=["hits", "lookups"], title="Cache hit rates (%)", range_y=[0, 100])
+        fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        calls, mean_calls = metrics.llm_calls_per_query(traces)
+        fig = px.bar(pd.DataFrame(calls), x="llm_calls", y="queries",
+                     title=f"LLM calls per query (mean {mean_calls:.2f})")
+        fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Throughput over time
+    throughput_df = pd.DataFrame(metrics.throughput(traces, bucket_seconds))
+    throughput_df["time"] = pd.to_datetime(throughput_df["time"], unit="s")
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=throughput_df["time"], y=throughput_df["requests_per_sec"], name="Requests/sec",
+                         marker_color='#3B82F6'))
+    fig.add_trace(go.Scatter(x=throughput_df["time"], y=throughput_df["p95_ms"], name="p95 latency (ms)",
+                             yaxis="y2", line=dict(color='#EF4444')))
+    fig.update_layout(
+        title=dict(text="Throughput over time", font=dict(size=18, family='Inter'), x=0.5),
+        yaxis=dict(title=dict(text="Requests/sec", font=dict(size=14))),
+        yaxis2=dict(title=dict(text="p95 latency (ms)", font=dict(size=14)), overlaying="y", side="right"),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        margin=dict(l=40, r=40, t=80, b=40)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    with st.expander("📋 Latency table"):
+        st.dataframe(pd.DataFrame(metrics.latency_by_route(traces) + metrics.latency_by_stage(traces)).round(1),
+                     use_container_width=True, hide_index=True)
+
 def render_document_page():
     """Enhanced document management interface."""
     st.markdown("<h1 class='main-header'>📁 Document Management</h1>", unsafe_allow_html=True)
@@ -1361,6 +1539,7 @@ def render_document_page():
                 "📅 Modified": datetime.datetime.fromtimestamp(file.stat().st_mtime).strftime("%Y-%m-%d %H:%M")
             })
         
+        import pandas as pd
         df = pd.DataFrame(doc_data)
         st.dataframe(df, use_container_width=True, hide_index=True)
 
@@ -1412,8 +1591,9 @@ def render_about_page():
         st.markdown("""
         1. **💬 Chat**: Ask questions and receive intelligent responses
         2. **📊 Evaluation**: Run benchmarks to assess AI performance  
-        3. **📁 Documents**: Upload files for RAG-based analysis
-        4. **⚙️ Control Panel**: Manage themes, tools, and settings
+        3. **⚡ Performance**: Inspect latency, cache hit rates and throughput
+        4. **📁 Documents**: Upload files for RAG-based analysis
+        5. **⚙️ Control Panel**: Manage themes, tools, and settings
         """)
     
     st.divider()
@@ -1456,6 +1636,8 @@ def main():
         render_chat_page()
     elif page == "📊 Evaluation":
         render_evaluation_page()
+    elif page == "⚡ Performance":
+        render_performance_page()
     elif page == "📁 Documents":
         render_document_page()
     elif page == "ℹ️ About":
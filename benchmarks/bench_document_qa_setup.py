@@ -0,0 +1,52 @@
+# type: ignore
+"""Per-call setup cost of document_qa: a fresh ChatGroq + RetrievalQA per question
+(the previous behaviour) versus the shared chain from get_qa_chain.
+
+Only object construction is timed, over a tiny in-memory FAISS store with fake
+embeddings, so no model download or network access is needed:
+
+    python -m benchmarks.bench_document_qa_setup --iterations 200
+"""
+import argparse
+import time
+from langchain.chains import RetrievalQA
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain_groq import ChatGroq
+from agent.config.settings import GROQ_API_KEY
+from agent.tools.document_qa import get_qa_chain
+
+
+def build_chain_per_call(store):
+    return RetrievalQA.from_chain_type(
+        llm=ChatGroq(api_key=GROQ_API_KEY, model="llama3-8b-8192", temperature=0),
+        chain_type="stuff",
+        retriever=store.as_retriever(search_kwargs={"k": 3}),
+        return_source_documents=False
+    )
+
+
+def time_per_call(func, store, iterations: int) -> float:
+    """Mean wall time of func(store) in milliseconds."""
+    func(store)  # warm imports and lazy caches
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(store)
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    store = FAISS.from_texts(["benchmark document"] * 8, FakeEmbeddings(size=384))
+    before = time_per_call(build_chain_per_call, store, args.iterations)
+    after = time_per_call(get_qa_chain, store, args.iterations)
+    print(f"Per-call setup, new client + chain : {before:.3f} ms")
+    print(f"Per-call setup, shared chain       : {after * 1000:.2f} us")
+    print(f"Saved per question                 : {before - after:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# type: ignore
+"""Recall@k, query latency and memory of the FAISS index types against the exact flat index.
+
+Vectors are the cached chunk embeddings (--source cache, see
+agent/rag/embedding_cache.py) or synthetic clustered vectors of the MiniLM
+dimension (--source synthetic, the default, sized with --vectors). Queries are
+held-out vectors perturbed with noise; recall@k is the share of the flat
+index's top k that each configuration also returns:
+
+    python -m benchmarks.bench_faiss_index --vectors 50000 --queries 500 --k 3 10
+"""
+import argparse
+import time
+import numpy as np
+from agent.metrics import percentile
+from agent.rag.index_types import build_index
+
+DEFAULT_PARAMS = {
+    "nlist": 256, "nprobe": 16, "hnsw_m": 32, "ef_construction": 200, "ef_search": 64,
+    "pq_m": 48, "pq_nbits": 8, "sq_type": "QT_8bit", "train_size": 20000,
+}
+# (label, index type, overrides of DEFAULT_PARAMS)
+CONFIGURATIONS = [
+    ("flat", "flat", {}),
+    ("ivf_flat nprobe=4", "ivf_flat", {"nprobe": 4}),
+    ("ivf_flat nprobe=16", "ivf_flat", {"nprobe": 16}),
+    ("ivf_flat nprobe=64", "ivf_flat", {"nprobe": 64}),
+    ("hnsw ef=16", "hnsw", {"ef_search": 16}),
+    ("hnsw ef=64", "hnsw", {"ef_search": 64}),
+    ("hnsw ef=256", "hnsw", {"ef_search": 256}),
+    ("ivf_sq nprobe=16", "ivf_sq", {"nprobe": 16}),
+    ("ivf_pq nprobe=16", "ivf_pq", {"nprobe": 16}),
+    ("ivf_pq nprobe=64", "ivf_pq", {"nprobe": 64}),
+]
+
+
+def synthetic_vectors(count: int, dim: int = 384, clusters: int = 100, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def cached_vectors(model: str = None):
+    from agent.config.settings import EMBEDDING_CACHE_PATH, EMBEDDING_MODEL
+    from agent.rag.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+    rows = cache._connect().execute(
+        "SELECT vector FROM embeddings WHERE model = ?", (model or EMBEDDING_MODEL,)
+    ).fetchall()
+    return np.stack([np.frombuffer(blob, dtype=np.float32) for blob, in rows]) if rows else None
+
+
+def index_bytes(index) -> int:
+    import faiss
+
+    return len(faiss.serialize_index(index))
+
+
+def recall_at_k(truth, found, k: int) -> float:
+    hits = sum(len(set(t[:k]) & set(f[:k])) for t, f in zip(truth, found))
+    return hits / (len(truth) * k)
+
+
+def run(vectors, queries, ks, configurations=CONFIGURATIONS):
+    """One result row per configuration: build seconds, memory, latency percentiles and recall@k."""
+    depth = max(ks)
+    rows, truth = [], None
+    for label, index_type, overrides in configurations:
+        params = {**DEFAULT_PARAMS, **overrides}
+        start = time.perf_counter()
+        index = build_index(vectors, index_type, params)
+        build_seconds = time.perf_counter() - start
+        index.search(queries[:1], depth)  # warm-up
+        latencies, found = [], []
+        for query in queries:
+            began = time.perf_counter()
+            _, ids = index.search(query[None, :], depth)
+            latencies.append((time.perf_counter() - began) * 1000)
+            found.append(ids[0].tolist())
+        if truth is None:
+            truth = found  # the first configuration is the exact flat baseline
+        row = {
+            "config": label,
+            "build_s": build_seconds,
+            "memory_mb": index_bytes(index) / 2 ** 20,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+        }
+        for k in ks:
+            row[f"recall@{k}"] = recall_at_k(truth, found, k)
+        rows.append(row)
+    return rows
+
+
+def format_rows(rows, ks) -> str:
+    header = f"{'config':<22}{'build s':>9}{'mem MB':>9}{'p50 ms':>9}{'p95 ms':>9}" + "".join(
+        f"{f'recall@{k}':>11}" for k in ks
+    )
+    lines = [header]
+    for row in rows:
+        lines.append(
+            f"{row['config']:<22}{row['build_s']:>9.2f}{row['memory_mb']:>9.1f}{row['p50_ms']:>9.3f}{row['p95_ms']:>9.3f}"
+            + "".join(f"{row[f'recall@{k}']:>11.3f}" for k in ks)
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", choices=["synthetic", "cache"], default="synthetic")
+    parser.add_argument("--vectors", type=int, default=50000, help="Synthetic corpus size.")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 10])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.source == "cache":
+        vectors = cached_vectors()
+        if vectors is None:
+            parser.error("The embedding cache is empty; index some documents first.")
+    else:
+        vectors = synthetic_vectors(args.vectors + args.queries, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(vectors))
+    query_count = min(args.queries, len(vectors) // 10 or 1)
+    queries = vectors[order[:query_count]] + 0.05 * rng.normal(size=(query_count, vectors.shape[1])).astype(np.float32)
+    corpus = vectors[order[query_count:]]
+    print(f"{len(corpus)} vectors of dimension {corpus.shape[1]}, {query_count} queries")
+    print(format_rows(run(corpus, np.ascontiguousarray(queries, dtype=np.float32), args.k), args.k))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# type: ignore
+"""Cold-start import cost of the agent, measured with `python -X importtime`.
+
+Each run starts a fresh interpreter, imports the target modules and parses the
+importtime report. The "eager" scenario additionally imports every tool module
+and builds the controller's LLM and agent executor, i.e. what importing
+agent.controller used to do before those were deferred to first use. The "app"
+scenario imports the Streamlit app, which runs its first render in bare mode,
+so it covers everything a user waits for before the page appears:
+
+    python -m benchmarks.bench_import_time --runs 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    "lazy": "import agent.controller",
+    "eager": (
+        "import agent.controller as c\n"
+        "for name in c.TOOL_MODULES: c.get_tool(name)\n"
+        "c.agent_executor\n"
+    ),
+    "app": "import app",
+}
+
+
+def parse_importtime(stderr: str):
+    """Return {module: (self_us, cumulative_us)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # the header line
+        # Nested imports keep their indentation, so top-level ones start without spaces
+        modules[name[1:].rstrip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once(code: str, root: str):
+    env = {**os.environ, "TRACE_ENABLED": "0"}
+    env.setdefault("GROQ_API_KEY", "import-benchmark")
+    env.setdefault("SERPER_API_KEY", "import-benchmark")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=root, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    modules = parse_importtime(completed.stderr)
+    total = sum(cumulative for name, (_, cumulative) in modules.items() if not name.startswith(" "))
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per scenario (median is reported).")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest top-level packages to list per scenario.")
+    args = parser.parse_args()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    medians = {}
+    for scenario, code in SCENARIOS.items():
+        totals, last = [], {}
+        try:
+            for _ in range(args.runs):
+                total, modules = run_once(code, root)
+                totals.append(total)
+                last = modules
+        except RuntimeError as e:
+            print(f"[{scenario}] skipped: {e}\n")
+            continue
+        medians[scenario] = statistics.median(totals) / 1000
+        print(f"[{scenario}] median import time over {args.runs} runs: {medians[scenario]:.0f} ms "
+              f"({len(last)} modules)")
+        packages = {}
+        for name, (_, cumulative) in last.items():
+            if not name.startswith(" "):
+                package = name.split(".")[0]
+                packages[package] = packages.get(package, 0) + cumulative
+        for package, cumulative in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {cumulative / 1000:8.1f} ms  {package}")
+        print()
+    if medians.get("eager"):
+        print(f"Deferred at startup: {medians['eager'] - medians['lazy']:.0f} ms "
+              f"({(1 - medians['lazy'] / medians['eager']) * 100:.0f}% of the eager import time)")
+
+
+if __name__ == "__main__":
+    main()
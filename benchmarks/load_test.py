@@ -0,0 +1,210 @@
+# type: ignore
+"""Open-loop load test: replay a JSONL request log against ask_agent at a target QPS.
+
+Requests are started on a fixed (or Poisson) arrival schedule regardless of how
+fast earlier ones finish, with at most --concurrency in flight; a request that
+has to wait for a slot keeps its scheduled start, so queueing shows up in the
+latency instead of silently lowering the offered load. Each log line needs a
+query under one of QUERY_FIELDS. Run it offline against a cassette with
+REPLAY_MODE=replay (see agent/replay.py):
+
+    REPLAY_MODE=replay python -m benchmarks.load_test --requests data/load/requests.jsonl --qps 5 --duration 60
+
+With --url the log is POSTed as {"query": ...} to an HTTP front end instead;
+a JSON reply may carry "response", "source" and "route".
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from agent.clients import run_sync, get_async_http_client
+from agent.config.settings import BASE_DIR
+from agent.errors import ERROR_RESULT_RE
+from agent.metrics import percentile
+from agent.tracing import add_trace_hook, remove_trace_hook
+from evaluation.datasets import iter_records
+
+QUERY_FIELDS = ("query", "question", "prompt", "input", "body", "title")
+HISTOGRAM_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# The per-request result dict, so the trace hook can attach the route of that request
+_current_result = contextvars.ContextVar("load_test_result", default=None)
+
+
+def load_queries(path: str, field: str = None):
+    queries = []
+    for record in iter_records(path):
+        if isinstance(record, str):
+            queries.append(record)
+            continue
+        fields = (field,) if field else QUERY_FIELDS
+        query = next((record[name] for name in fields if record.get(name)), None)
+        if query:
+            queries.append(str(query))
+    return queries
+
+
+def arrival_offsets(count: int, qps: float, poisson: bool, rng: random.Random):
+    """Start times in seconds after the run begins, for count requests at qps."""
+    offsets, now = [], 0.0
+    for _ in range(count):
+        offsets.append(now)
+        now += rng.expovariate(qps) if poisson else 1.0 / qps
+    return offsets
+
+
+def _on_trace(trace):
+    result = _current_result.get()
+    if result is not None:
+        result["route"] = trace["attrs"].get("route", "UNKNOWN")
+        result["llm_calls"] = trace["llm_calls"]
+
+
+async def _ask_in_process(query: str):
+    from agent.controller import aask_agent
+
+    response, source = await aask_agent(query)
+    return response, source, None
+
+
+async def _ask_http(url: str, query: str):
+    reply = await get_async_http_client().post(url, json={"query": query})
+    reply.raise_for_status()
+    try:
+        data = reply.json()
+    except ValueError:
+        return reply.text, "http", None
+    return data.get("response", ""), data.get("source", "http"), data.get("route")
+
+
+async def run_load(queries, qps: float, concurrency: int, url: str = None, poisson: bool = False, seed: int = 0):
+    """Fire queries on the arrival schedule and return one result dict per request."""
+    rng = random.Random(seed)
+    offsets = arrival_offsets(len(queries), qps, poisson, rng)
+    slots = asyncio.Semaphore(concurrency)
+    results = []
+    start = time.perf_counter()
+
+    async def one(index, query, offset):
+        result = {"index": index, "scheduled": offset, "route": None, "llm_calls": None, "error": False}
+        _current_result.set(result)
+        async with slots:
+            began = time.perf_counter()
+            result["queue_ms"] = (began - start - offset) * 1000
+            try:
+                if url:
+                    response, source, route = await _ask_http(url, query)
+                else:
+                    response, source, route = await _ask_in_process(query)
+                result["error"] = bool(ERROR_RESULT_RE.match(str(response)))
+            except Exception as e:
+                source, route = f"exception: {type(e).__name__}", None
+                result["error"] = True
+            finished = time.perf_counter()
+        result["service_ms"] = (finished - began) * 1000
+        result["latency_ms"] = (finished - start - offset) * 1000
+        result["finished"] = finished - start
+        result["route"] = route or result["route"] or source
+        results.append(result)
+
+    tasks = []
+    for index, (query, offset) in enumerate(zip(queries, offsets)):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(index, query, offset)))
+    await asyncio.gather(*tasks)
+    return sorted(results, key=lambda result: result["index"])
+
+
+def _histogram(latencies):
+    counts = Counter()
+    for latency in latencies:
+        bucket = next((bound for bound in HISTOGRAM_MS if latency <= bound), None)
+        counts[bucket] += 1
+    lines, previous = [], 0
+    width = max(counts.values()) if counts else 1
+    for bound in HISTOGRAM_MS + (None,):
+        label = f"<= {bound} ms" if bound is not None else f"> {previous} ms"
+        count = counts[bound]
+        lines.append(f"  {label:>12} {count:6d} {'#' * round(40 * count / width)}")
+        previous = bound if bound is not None else previous
+    return "\n".join(lines)
+
+
+def report(results, qps: float, concurrency: int) -> str:
+    total = len(results)
+    if not total:
+        return "No requests were sent."
+    wall = max(result["finished"] for result in results)
+    latencies = [result["latency_ms"] for result in results]
+    errors = sum(result["error"] for result in results)
+    lines = [
+        f"Requests: {total} at target {qps:g} QPS, concurrency {concurrency}",
+        f"Wall time: {wall:.2f} s, throughput: {total / wall if wall else 0.0:.2f} req/s",
+        f"Errors: {errors} ({errors / total * 100:.1f}%)",
+        "Latency (ms, from scheduled start) p50/p95/p99/max: "
+        f"{percentile(latencies, 50):.0f}/{percentile(latencies, 95):.0f}/{percentile(latencies, 99):.0f}/{max(latencies):.0f}",
+        f"Queue wait (ms) p50/p95: {percentile([r['queue_ms'] for r in results], 50):.0f}/"
+        f"{percentile([r['queue_ms'] for r in results], 95):.0f}",
+        "Latency histogram:",
+        _histogram(latencies),
+        "Per route:",
+        f"  {'route':<28}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'llm/req':>9}",
+    ]
+    by_route = defaultdict(list)
+    for result in results:
+        by_route[result["route"]].append(result)
+    for route, group in sorted(by_route.items(), key=lambda item: -len(item[1])):
+        route_latencies = [result["latency_ms"] for result in group]
+        calls = [result["llm_calls"] for result in group if result["llm_calls"] is not None]
+        lines.append(
+            f"  {str(route)[:27]:<28}{len(group):>7}{sum(r['error'] for r in group):>8}"
+            f"{percentile(route_latencies, 50):>10.0f}{percentile(route_latencies, 95):>10.0f}"
+            f"{(sum(calls) / len(calls) if calls else 0.0):>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", default=os.path.join(BASE_DIR, "requests.jsonl"), help="JSONL request log.")
+    parser.add_argument("--field", help="Record field holding the query (default: first of %s)." % ", ".join(QUERY_FIELDS))
+    parser.add_argument("--qps", type=float, default=2.0, help="Target arrival rate.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight.")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds, cycling through the log.")
+    parser.add_argument("--limit", type=int, help="Send at most this many requests.")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times instead of uniform.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="POST to this HTTP front end instead of calling ask_agent in-process.")
+    parser.add_argument("--output", help="Also write per-request results as JSON lines here.")
+    args = parser.parse_args()
+
+    queries = load_queries(args.requests, args.field)
+    if not queries:
+        parser.error(f"No queries found in {args.requests}.")
+    count = len(queries)
+    if args.duration:
+        count = max(1, int(args.duration * args.qps))
+    if args.limit:
+        count = min(count, args.limit)
+    queries = [queries[i % len(queries)] for i in range(count)]
+
+    add_trace_hook(_on_trace)
+    try:
+        results = run_sync(run_load(queries, args.qps, args.concurrency, args.url, args.poisson, args.seed))
+    finally:
+        remove_trace_hook(_on_trace)
+    print(report(results, args.qps, args.concurrency))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for result, query in zip(results, queries):
+                f.write(json.dumps({**result, "query": query}, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# type: ignore
+import json
+
+READ_SIZE = 1 << 16
+WHITESPACE = " \t\r\n"
+DELIMITERS = WHITESPACE + ",:]}"
+
+
+def _iter_json_container(f):
+    """Yield the elements of a top-level JSON array, or (key, value) pairs of an object,
+    decoding one element at a time so only the current element is held in memory."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(READ_SIZE)
+        buf, pos = buf[pos:] + chunk, 0
+        eof = not chunk
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def decode():
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # A number cut by the chunk boundary ("1" of "1.5") decodes early,
+                # so only accept a value that is followed by a delimiter.
+                if (end < len(buf) and buf[end] in DELIMITERS) or eof:
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    fill()
+    skip(WHITESPACE)
+    if pos >= len(buf) or buf[pos] not in "[{":
+        raise ValueError("Expected a JSON array or object at the top level.")
+    is_object = buf[pos] == "{"
+    closing = "}" if is_object else "]"
+    pos += 1
+    while True:
+        skip(WHITESPACE + ",")
+        if pos >= len(buf):
+            raise ValueError("Unexpected end of JSON input.")
+        if buf[pos] == closing:
+            return
+        if is_object:
+            key = decode()
+            skip(WHITESPACE)
+            if pos >= len(buf) or buf[pos] != ":":
+                raise ValueError(f"Expected ':' after key {key!r}.")
+            pos += 1
+            skip(WHITESPACE)
+            yield key, decode()
+        else:
+            yield decode()
+
+
+def iter_records(path: str):
+    """Stream records from a .jsonl file (one object per line) or a .json array/object.
+
+    For a JSON object such as {"1": {...}, "2": {...}} the values are yielded.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        for element in _iter_json_container(f):
+            yield element[1] if isinstance(element, tuple) else element
+
+
+def parse_shard(spec: str):
+    """Parse "i/n" into (i, n) with 0 <= i < n."""
+    index, count = (int(part) for part in spec.split("/"))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {spec!r}; expected i/n with 0 <= i < n.")
+    return index, count
+
+
+def shard_records(records, shard=None, limit: int = None):
+    """Keep every n-th record starting at i for shard (i, n), then stop after limit records."""
+    kept = 0
+    for position, record in enumerate(records):
+        if shard is not None and position % shard[1] != shard[0]:
+            continue
+        if limit is not None and kept >= limit:
+            return
+        kept += 1
+        yield record
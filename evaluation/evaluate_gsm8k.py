@@ -1,25 +1,46 @@
 # type: ignore
+import argparse
+import os
 from agent.controller import ask_agent
+from agent.config.settings import BASE_DIR
+from evaluation.datasets import iter_records, shard_records, parse_shard
+from evaluation.runner import run_benchmark
 
-def evaluate_gsm8k():
-    gsm8k_data = [
-        {"question": "A farmer has 15 cows. All but 8 die. How many cows does the farmer have left?", "answer": "8"},
-        {"question": "John has 5 apples. He gives 2 to Mary and then buys 7 more. How many apples does he have now?", "answer": "10"},
-        {"question": "A pizza is cut into 8 slices. If 3 people eat 2 slices each, how many slices are left?", "answer": "2"},
-        {"question": "A book has 250 pages. If Sarah reads 30 pages each day, how many days will it take her to finish the book?", "answer": "9"},
-        {"question": "A car travels at 60 miles per hour. How far will it travel in 2.5 hours?", "answer": "150"},
-        {"question": "A store sells apples for $0.50 each. If you buy a dozen, you get a 10% discount. How much does a dozen apples cost?", "answer": "5.40"},
-        {"question": "There are 24 students in a class. If 3/8 of them are boys, how many girls are in the class?", "answer": "15"},
-        {"question": "A recipe requires 3/4 cup of flour. If you want to make 1/3 of the recipe, how much flour do you need?", "answer": "0.25"},
-        {"question": "A rectangular garden is 12 feet long and 8 feet wide. What is the area of the garden?", "answer": "96"},
-        {"question": "Tom is twice as old as Jerry. If Jerry is 6 years old, how old is Tom?", "answer": "12"}
-    ]
+GSM8K_PATH = os.path.join(BASE_DIR, "data", "benchmarks", "gsm8k", "gsm8k_test.json")
+
+def gsm8k_item(record: dict) -> dict:
+    """Normalize a record; the official GSM8k files put the final answer after '####'."""
+    answer = str(record["answer"]).split("####")[-1].strip().replace(",", "")
+    return {"question": record["question"], "answer": answer}
+
+def evaluate_gsm8k(workers: int = 4, checkpoint_path: str = None, data_path: str = GSM8K_PATH, shard=None, limit: int = None):
+    """Score ask_agent on GSM8k questions streamed from data_path (.json or .jsonl).
+
+    shard=(i, n) evaluates every n-th question starting at i, so a large run can
+    be split across processes or machines.
+    """
+    gsm8k_data = (gsm8k_item(record) for record in shard_records(iter_records(data_path), shard, limit))
+    records = run_benchmark(
+        gsm8k_data, lambda item: ask_agent(item["question"]), workers=workers, checkpoint_path=checkpoint_path
+    )
     correct = 0
     results = ""
-    for item in gsm8k_data:
-        response, _ = ask_agent(item["question"])
+    for record in records:
+        item, response = record["item"], record["response"]
         if item["answer"] in response:
             correct += 1
         results += f"Q: {item['question']}\nA: {response}\nCorrect: {item['answer']}\n\n"
-    accuracy = (correct / len(gsm8k_data)) * 100
-    return f"GSM8k Accuracy: {accuracy}%\n\n{results}"
\ No newline at end of file
+    accuracy = (correct / len(records)) * 100 if records else 0.0
+    return f"GSM8k Accuracy: {accuracy}%\n\n{results}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the GSM8k benchmark against ask_agent.")
+    parser.add_argument("--workers", type=int, default=4, help="Questions answered concurrently.")
+    parser.add_argument("--checkpoint", help="JSONL file to record progress in and resume from.")
+    parser.add_argument("--data", default=GSM8K_PATH, help="GSM8k questions as .json or .jsonl.")
+    parser.add_argument("--shard", type=parse_shard, help="Evaluate shard i of n, written as i/n.")
+    parser.add_argument("--limit", type=int, help="Stop after this many questions.")
+    args = parser.parse_args()
+    print(evaluate_gsm8k(
+        workers=args.workers, checkpoint_path=args.checkpoint, data_path=args.data, shard=args.shard, limit=args.limit
+    ))
@@ -1,26 +1,51 @@
 # type: ignore
+import argparse
+import os
 from agent.controller import ask_agent
+from agent.config.settings import BASE_DIR
+from evaluation.datasets import iter_records, shard_records, parse_shard
+from evaluation.runner import run_benchmark
 
-def evaluate_lama():
-    lama_data = {
-        "1": {"question": "The capital of France is [MASK].", "answer": ["Paris"]},
-        "2": {"question": "The largest planet in our solar system is [MASK].", "answer": ["Jupiter"]},
-        "3": {"question": "The chemical symbol for gold is [MASK].", "answer": ["Au"]},
-        "4": {"question": "The author of 'Romeo and Juliet' is [MASK].", "answer": ["William Shakespeare", "Shakespeare"]},
-        "5": {"question": "The longest river in the world is [MASK].", "answer": ["Nile", "Amazon"]},
-        "6": {"question": "The largest ocean on Earth is the [MASK] Ocean.", "answer": ["Pacific"]},
-        "7": {"question": "The process by which plants make food is called [MASK].", "answer": ["photosynthesis"]},
-        "8": {"question": "The hardest natural substance on Earth is [MASK].", "answer": ["diamond"]},
-        "9": {"question": "The country with the largest population in the world is [MASK].", "answer": ["China", "India"]},
-        "10": {"question": "The smallest bone in the human body is located in the [MASK].", "answer": ["ear"]}
-    }
+LAMA_PATH = os.path.join(BASE_DIR, "data", "benchmarks", "lama", "lama_test.json")
+
+def lama_item(record: dict) -> dict:
+    """Normalize a record from our {"question", "answer"} files or the LAMA
+    TREx/Google-RE/ConceptNet jsonl files ({"masked_sentences", "obj_label"})."""
+    question = record.get("question") or record["masked_sentences"][0]
+    answer = record.get("answer", record.get("obj_label"))
+    return {"question": question, "answer": answer if isinstance(answer, list) else [answer]}
+
+def evaluate_lama(workers: int = 4, checkpoint_path: str = None, data_path: str = LAMA_PATH, shard=None, limit: int = None):
+    """Score ask_agent on LAMA cloze questions streamed from data_path (.json or .jsonl).
+
+    shard=(i, n) evaluates every n-th question starting at i, so a large run can
+    be split across processes or machines.
+    """
+    lama_data = (lama_item(record) for record in shard_records(iter_records(data_path), shard, limit))
+    records = run_benchmark(
+        lama_data,
+        lambda item: ask_agent(item["question"].replace("[MASK]", "what?")),
+        workers=workers,
+        checkpoint_path=checkpoint_path,
+    )
     correct = 0
     results = ""
-    for key, item in lama_data.items():
-        query = item["question"].replace("[MASK]", "what?")
-        response, _ = ask_agent(query)
+    for record in records:
+        item, response = record["item"], record["response"]
         if any(ans.lower() in response.lower() for ans in item["answer"]):
             correct += 1
         results += f"Q: {item['question']}\nA: {response}\nCorrect: {item['answer']}\n\n"
-    accuracy = (correct / len(lama_data)) * 100
-    return f"LAMA Accuracy: {accuracy}%\n\n{results}"
\ No newline at end of file
+    accuracy = (correct / len(records)) * 100 if records else 0.0
+    return f"LAMA Accuracy: {accuracy}%\n\n{results}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the LAMA benchmark against ask_agent.")
+    parser.add_argument("--workers", type=int, default=4, help="Questions answered concurrently.")
+    parser.add_argument("--checkpoint", help="JSONL file to record progress in and resume from.")
+    parser.add_argument("--data", default=LAMA_PATH, help="LAMA questions as .json or .jsonl.")
+    parser.add_argument("--shard", type=parse_shard, help="Evaluate shard i of n, written as i/n.")
+    parser.add_argument("--limit", type=int, help="Stop after this many questions.")
+    args = parser.parse_args()
+    print(evaluate_lama(
+        workers=args.workers, checkpoint_path=args.checkpoint, data_path=args.data, shard=args.shard, limit=args.limit
+    ))
@@ -0,0 +1,191 @@
+# type: ignore
+"""Routing accuracy, latency and token benchmarks on labeled routing data.
+
+Controller LLM calls go through agent.replay like every other LLM call: record
+a cassette once with live keys, then rerun offline and deterministically:
+
+    REPLAY_MODE=record python -m evaluation.evaluate_routing pipeline
+    REPLAY_MODE=replay python -m evaluation.evaluate_routing pipeline
+
+Queries whose reply is missing from the cassette are reported as skipped and
+left out of the accuracy and the confusion matrix.
+"""
+import argparse
+import os
+import time
+from collections import Counter
+import agent.controller as controller
+from agent.cache import MemoryCache
+from agent.clients import run_sync
+from agent.config.settings import BASE_DIR
+from agent.controller import CONTROLLER_PROMPTS, DECISIONS, llm_decide, route_query
+from agent.metrics import percentile
+from agent.replay import CassetteMiss
+from evaluation.datasets import iter_records, shard_records, parse_shard
+from evaluation.runner import run_benchmark
+
+ROUTING_PATH = os.path.join(BASE_DIR, "data", "benchmarks", "routing", "routing_test.json")
+
+
+def routing_item(record: dict) -> dict:
+    return {"query": record["query"], "decision": record["decision"].strip().upper()}
+
+
+def split_missing(records):
+    """(records to score, number skipped because their reply is missing from the cassette)."""
+    scored = [record for record in records if not (isinstance(record["source"], dict) and record["source"].get("missing"))]
+    return scored, len(records) - len(scored)
+
+
+def route_with_prompt(query: str, mode: str):
+    """Route query with the given prompt mode; returns (decision, usage reported by the LLM).
+
+    A query whose reply is missing from the replay cassette comes back as
+    (None, {"missing": True}).
+    """
+    record = {"attrs": {}}
+    try:
+        decision, _ = run_sync(llm_decide(query, prompt=CONTROLLER_PROMPTS[mode], record=record))
+    except CassetteMiss:
+        return None, {"missing": True}
+    return decision, {key: record["attrs"].get(key, 0) for key in ("prompt_tokens", "completion_tokens")}
+
+
+def template_prompt_tokens(mode: str) -> int:
+    """Prompt tokens the LLM reports for mode's template with an empty query, 0 if unavailable."""
+    try:
+        return route_with_prompt("", mode)[1].get("prompt_tokens", 0)
+    except Exception as e:
+        print(f"Template token count for {mode} failed: {e}")
+        return 0
+
+
+def evaluate_routing(modes=("full", "compact"), workers: int = 4, data_path: str = ROUTING_PATH, shard=None,
+                     limit: int = None):
+    """Compare routing accuracy, decision latency and prompt tokens of the controller prompt modes.
+
+    Every query goes straight to the controller LLM (no pre-router or route
+    cache) so the prompts are compared on equal terms. Token counts are the
+    usage the LLM reports; the template's own size is the prompt tokens of one
+    extra call with an empty query.
+    """
+    items = [routing_item(record) for record in shard_records(iter_records(data_path), shard, limit)]
+    report = ""
+    for mode in modes:
+        records, skipped = split_missing(
+            run_benchmark(items, lambda item: route_with_prompt(item["query"], mode), workers=workers)
+        )
+        correct = sum(record["response"] == record["item"]["decision"] for record in records)
+        latencies = [record["seconds"] * 1000 for record in records]
+        usages = [record["source"] for record in records
+                  if isinstance(record["source"], dict) and record["source"]["prompt_tokens"]]
+        prompt_tokens = sum(usage["prompt_tokens"] for usage in usages) / len(usages) if usages else 0.0
+        completion_tokens = sum(usage["completion_tokens"] for usage in usages) / len(usages) if usages else 0.0
+        accuracy = (correct / len(records)) * 100 if records else 0.0
+        template_tokens = template_prompt_tokens(mode)
+        report += (
+            f"[{mode}] Routing Accuracy: {accuracy:.1f}% ({correct}/{len(records)})"
+            + (f", {skipped} skipped without a recorded reply" if skipped else "") + "\n"
+            f"  Template tokens: {template_tokens if template_tokens else 'not reported'}\n"
+            f"  Prompt tokens/query: {prompt_tokens:.1f}, completion tokens/query: {completion_tokens:.1f} "
+            f"(LLM-reported usage for {len(usages)}/{len(records)} queries)\n"
+            f"  Decision latency p50/p95/p99: {percentile(latencies, 50):.0f}/{percentile(latencies, 95):.0f}/"
+            f"{percentile(latencies, 99):.0f} ms\n"
+        )
+        for record in records:
+            if record["response"] != record["item"]["decision"]:
+                report += f"  miss: {record['item']['query']!r} expected {record['item']['decision']}, got {record['response']}\n"
+        report += "\n"
+    return report
+
+
+def route_with_pipeline(query: str):
+    """Route query through pre-router, route cache and LLM; returns (decision, routing attrs).
+
+    A query whose controller reply is missing from the replay cassette comes
+    back as (None, {"missing": True}).
+    """
+    record = {"attrs": {}}
+    start = time.perf_counter()
+    try:
+        decision, _ = run_sync(route_query(query, record))
+    except CassetteMiss:
+        return None, {"missing": True}
+    record["attrs"]["latency_ms"] = (time.perf_counter() - start) * 1000
+    return decision, record["attrs"]
+
+
+def confusion_matrix(records) -> str:
+    """Text confusion matrix, expected decision by row and predicted decision by column."""
+    labels = list(DECISIONS) + ["OTHER"]
+    counts = Counter(
+        (record["item"]["decision"], record["response"] if record["response"] in DECISIONS else "OTHER")
+        for record in records
+    )
+    width = max(len(label) for label in labels) + 2
+    lines = ["expected \\ predicted".ljust(width + 10) + "".join(label[:9].rjust(10) for label in labels)]
+    for expected in DECISIONS:
+        lines.append(expected.ljust(width + 10) + "".join(str(counts[(expected, predicted)]).rjust(10) for predicted in labels))
+    return "\n".join(lines)
+
+
+def evaluate_routing_pipeline(workers: int = 4, data_path: str = ROUTING_PATH, shard=None, limit: int = None,
+                              passes: int = 2):
+    """Benchmark decide_route end to end: accuracy, confusion matrix, latency and LLM calls.
+
+    The dataset is routed passes times against an empty in-memory route cache,
+    so the first pass measures cold routing and later passes the cache. With
+    REPLAY_MODE=replay the recorded latency of each controller call is replayed
+    (scaled by REPLAY_LATENCY_SCALE).
+    """
+    items = [routing_item(record) for record in shard_records(iter_records(data_path), shard, limit)]
+    saved_cache = controller.cache_backend
+    controller.cache_backend = MemoryCache()
+    report = ""
+    try:
+        for number in range(1, passes + 1):
+            records, skipped = split_missing(
+                run_benchmark(items, lambda item: route_with_pipeline(item["query"]), workers=workers)
+            )
+            attrs = [record["source"] if isinstance(record["source"], dict) else {} for record in records]
+            correct = sum(record["response"] == record["item"]["decision"] for record in records)
+            accuracy = (correct / len(records)) * 100 if records else 0.0
+            llm_calls = sum(a.get("llm_calls", 0) for a in attrs)
+            report += (
+                f"Pass {number}: Routing Accuracy: {accuracy:.1f}% ({correct}/{len(records)})"
+                + (f", {skipped} skipped without a recorded reply" if skipped else "") + "\n"
+                f"  LLM calls: {llm_calls} ({llm_calls / len(records) if records else 0.0:.2f}/query), "
+                f"prompt tokens: {sum(a.get('prompt_tokens', 0) for a in attrs)}\n"
+            )
+            methods = Counter(a.get("method", "error") for a in attrs)
+            for method in ("pre_router", "cache", "llm", "error"):
+                latencies = [a.get("latency_ms", r["seconds"] * 1000) for r, a in zip(records, attrs)
+                             if a.get("method", "error") == method]
+                if latencies:
+                    report += (
+                        f"  {method}: {methods[method]} queries, p50/p95/p99 "
+                        f"{percentile(latencies, 50):.2f}/{percentile(latencies, 95):.2f}/{percentile(latencies, 99):.2f} ms\n"
+                    )
+            report += confusion_matrix(records) + "\n\n"
+    finally:
+        controller.cache_backend = saved_cache
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Routing accuracy and latency benchmarks on labeled routing data.")
+    parser.add_argument("suite", nargs="?", default="prompts", choices=["prompts", "pipeline"],
+                        help="prompts: compare controller prompt modes; pipeline: benchmark decide_route end to end.")
+    parser.add_argument("--modes", nargs="+", default=list(CONTROLLER_PROMPTS), choices=list(CONTROLLER_PROMPTS))
+    parser.add_argument("--workers", type=int, default=4, help="Queries routed concurrently.")
+    parser.add_argument("--data", default=ROUTING_PATH, help="Labeled {query, decision} records as .json or .jsonl.")
+    parser.add_argument("--shard", type=parse_shard, help="Evaluate shard i of n, written as i/n.")
+    parser.add_argument("--limit", type=int, help="Stop after this many queries.")
+    parser.add_argument("--passes", type=int, default=2, help="Passes over the dataset (pipeline suite).")
+    args = parser.parse_args()
+    if args.suite == "pipeline":
+        print(evaluate_routing_pipeline(
+            workers=args.workers, data_path=args.data, shard=args.shard, limit=args.limit, passes=args.passes
+        ))
+    else:
+        print(evaluate_routing(modes=args.modes, workers=args.workers, data_path=args.data, shard=args.shard, limit=args.limit))
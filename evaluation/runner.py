@@ -0,0 +1,106 @@
+# type: ignore
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from agent.errors import ERROR_RESULT_RE
+
+RATE_LIMIT_RE = re.compile(r"^[\w ]*Error: .*(\b429\b|rate[ _-]?limit|too many requests)", re.IGNORECASE | re.DOTALL)
+ACCURACY_RE = re.compile(r"Accuracy:\s*(\d+(?:\.\d+)?)\s*%")
+
+
+def parse_accuracy(result: str):
+    """Extract the percentage from an evaluator's "... Accuracy: X%" summary, or None."""
+    match = ACCURACY_RE.search(str(result))
+    return float(match.group(1)) if match else None
+
+
+def load_checkpoint(checkpoint_path: str) -> dict:
+    """Read completed records from a JSONL checkpoint, keyed by item index."""
+    done = {}
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            done[record["index"]] = record
+    return done
+
+
+def run_benchmark(items, answer_fn, workers: int = 4, checkpoint_path: str = None, max_retries: int = 5,
+                  backoff_base: float = 2.0, backoff_max: float = 60.0):
+    """Answer every item with answer_fn on a thread pool and return records in input order.
+
+    answer_fn(item) returns (response, source). Items are pulled lazily from any
+    iterable with at most 2 * workers in flight, so generators stay streaming.
+    A rate-limit error makes every worker pause for an exponentially growing,
+    jittered delay before retrying. Each finished record is appended to
+    checkpoint_path, and a rerun with the same file skips items already answered
+    without an error.
+    Each record is {"index", "item", "response", "source", "attempts", "seconds"}.
+    """
+    done = load_checkpoint(checkpoint_path)
+    results = {}
+    pause_until = [0.0]
+    lock = threading.Lock()
+
+    def call(index, item):
+        start = time.perf_counter()
+        for attempt in range(max_retries + 1):
+            delay = pause_until[0] - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                response, source = answer_fn(item)
+            except Exception as e:
+                response, source = f"Error: {str(e)}", "❌ Error"
+            if attempt == max_retries or not RATE_LIMIT_RE.match(str(response)):
+                break
+            backoff = min(backoff_max, backoff_base * 2 ** attempt) * (0.5 + random.random() / 2)
+            with lock:
+                pause_until[0] = max(pause_until[0], time.monotonic() + backoff)
+        return {
+            "index": index,
+            "item": item,
+            "response": response,
+            "source": source,
+            "attempts": attempt + 1,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    checkpoint = None
+    if checkpoint_path:
+        os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+        checkpoint = open(checkpoint_path, "a", encoding="utf-8")
+
+    def collect(futures):
+        for future in futures:
+            record = future.result()
+            results[record["index"]] = record
+            if checkpoint:
+                checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for index, item in enumerate(items):
+                previous = done.get(index)
+                if previous is not None and previous["item"] == item and not ERROR_RESULT_RE.match(str(previous["response"])):
+                    results[index] = previous
+                    continue
+                if len(pending) >= 2 * workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                pending.add(pool.submit(call, index, item))
+            collect(pending)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+    return [results[index] for index in sorted(results)]
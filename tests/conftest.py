@@ -0,0 +1,6 @@
+import os
+
+# agent.config.settings refuses to import without API keys; tests never call the APIs
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("SERPER_API_KEY", "test")
+os.environ.setdefault("TRACE_ENABLED", "0")
@@ -0,0 +1,18 @@
+import agent.tracing as tracing
+from agent import metrics
+from agent.tracing import trace_request
+
+
+def test_load_traces_reads_rotated_backups_oldest_first(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_ENABLED", True)
+    monkeypatch.setattr(tracing, "TRACE_PATH", str(path))
+    monkeypatch.setattr(tracing, "TRACE_MAX_BYTES", 1)
+    monkeypatch.setattr(tracing, "TRACE_BACKUPS", 3)
+    # Every trace is over TRACE_MAX_BYTES, so each one rotates the previous file out
+    for number in range(4):
+        with trace_request(f"request_{number}"):
+            pass
+    assert (tmp_path / "traces.jsonl.3").exists()
+    names = [trace["name"] for trace in metrics.load_traces(str(path))]
+    assert names == ["request_0", "request_1", "request_2", "request_3"]
@@ -0,0 +1,17 @@
+import pytest
+from agent.router import classify, pre_route
+
+
+@pytest.mark.parametrize("query", [
+    "How many continents are there?",
+    "how many planets are there",
+    "How much does an iPhone 15 cost?",
+    "how many days in a leap year",
+])
+def test_general_knowledge_is_not_math_solver(query):
+    assert pre_route(query) != "MATH_SOLVER"
+
+
+def test_word_problem_still_routes_locally():
+    decision, confidence = classify("A bakery has 120 cookies and sells 45 each day. How many days until they run out?")
+    assert decision == "MATH_SOLVER" and confidence > 0.5
@@ -0,0 +1,34 @@
+from agent.cache import SemanticCache
+
+
+def embed_words(text):
+    # Same vector for every query, so only the math guard can tell them apart
+    return [1.0, 0.0]
+
+
+def test_operator_changes_miss():
+    cache = SemanticCache(embed_fn=embed_words, threshold=0.5, maxsize=10)
+    cache.put("what is 5+3", "8", "🧮 Calculator Tool", "CALCULATOR")
+    assert cache.get("what is 5 + 3?") == ("8", "🧮 Calculator Tool")
+    assert cache.get("what is 5*3") is None
+    assert cache.get("what is 5*-3") is None
+    assert cache.get("what is 5 times 3") is None
+
+
+def test_same_expression_reworded_hits():
+    cache = SemanticCache(embed_fn=embed_words, threshold=0.5, maxsize=10)
+    cache.put("calculate 5*3", "15", "🧮 Calculator Tool", "CALCULATOR")
+    assert cache.get("what is 5*3") == ("15", "🧮 Calculator Tool")
+
+
+def test_generation_change_misses():
+    # Another process saving a new index bumps the generation
+    generation = [1]
+    cache = SemanticCache(embed_fn=embed_words, threshold=0.5, maxsize=10,
+                          generations={"DOCUMENT_QA": lambda: generation[0]})
+    cache.put("what does the report say", "old answer", "📄 Document QA", "DOCUMENT_QA")
+    cache.put("capital of france", "Paris", "🤖 Direct Answer", "DIRECT")
+    assert cache.get("what does the report say") == ("old answer", "📄 Document QA")
+    generation[0] = 2
+    assert cache.get("what does the report say") is None
+    assert cache.get("capital of france") == ("Paris", "🤖 Direct Answer")
@@ -0,0 +1,24 @@
+import agent.tracing as tracing
+from agent.tracing import span, trace_request
+
+
+def test_trace_file_never_holds_query_text_in_hash_mode(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_ENABLED", True)
+    monkeypatch.setattr(tracing, "TRACE_PATH", str(path))
+    monkeypatch.setattr(tracing, "TRACE_QUERY_MODE", "hash")
+    query = "what is 1234*5678 for my private account"
+    with trace_request("ask_agent", query=query):
+        with span("chain", tool_order=f"CALCULATOR on {query}"):
+            pass
+        with span("sympy_eval", expression="1234*5678"):
+            pass
+        try:
+            with span("tool"):
+                raise ValueError(f"could not parse {query}")
+        except ValueError:
+            pass
+    text = path.read_text(encoding="utf-8")
+    assert "sha256:" in text
+    assert "1234*5678" not in text
+    assert "private account" not in text